@@ -0,0 +1,54 @@
+"""
+Standalone benchmarks, run from the project root, e.g.
+`python -m benchmarks.book_search`. Each benchmark works on a throwaway
+test database, so the development database is never touched.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup() -> None:
+    # Like the test suite, benchmarks must not depend on Redis, a Celery
+    # broker or Stripe
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "library_service.test_settings"
+    )
+    django.setup()
+
+
+@contextmanager
+def test_database(on_disk: bool = False):
+    """
+    `on_disk` keeps a SQLite test database in a file instead of memory,
+    which concurrent benchmarks need to give every thread a connection.
+    """
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    if on_disk and connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            tempfile.mkdtemp(), "benchmark.sqlite3"
+        )
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(func, repeat: int = 1) -> float:
+    """Return the mean wall time of `func()` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
@@ -0,0 +1,76 @@
+"""
+Compares `?search=` on the full-text index with a plain LIKE scan while the
+catalog grows up to 1M books. Index lookups should stay roughly flat while
+the scan grows linearly with the catalog.
+"""
+import argparse
+import random
+
+from benchmarks import setup, test_database, timed
+
+WORDS = (
+    "river stone night garden empire shadow winter glass iron silent "
+    "orchard harbor crimson paper lantern forest hollow quiet summer ember"
+).split()
+
+
+def fill_catalog(start: int, stop: int, batch_size: int = 10_000) -> None:
+    from books.models import Book
+
+    for offset in range(start, stop, batch_size):
+        Book.objects.bulk_create(
+            Book(
+                title=f"{random.choice(WORDS)} {random.choice(WORDS)} n{index}",
+                author=f"{random.choice(WORDS)} {random.choice(WORDS)}",
+                cover="S",
+                inventory=1,
+                daily_fee=1,
+            )
+            for index in range(offset, min(offset + batch_size, stop))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", default="10000,100000,1000000",
+        help="comma separated catalog sizes",
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from books.models import Book
+    from books.search import search_books
+
+    random.seed(0)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    with test_database():
+        print(f"{'books':>10} {'index ms':>10} {'scan ms':>10}")
+        filled = 0
+        for size in sizes:
+            fill_catalog(filled, size)
+            filled = size
+            terms = [f"n{random.randrange(size)}" for _ in range(args.queries)]
+
+            def indexed():
+                for term in terms:
+                    list(
+                        search_books(Book.objects.all(), term)
+                        .order_by("search_rank", "id")[:20]
+                    )
+
+            def scan():
+                for term in terms:
+                    list(Book.objects.filter(title__icontains=term)[:20])
+
+            print(
+                f"{size:>10} "
+                f"{timed(indexed) / args.queries:>10.3f} "
+                f"{timed(scan) / args.queries:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Fires parallel checkouts at one popular book and reports throughput and
+how many copies were oversold. `naive` is the old read-modify-write
+(`book.inventory -= 1; book.save()`), `atomic` the conditional UPDATE.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import setup, test_database
+
+
+def naive_reserve(book_id: int) -> bool:
+    from books.models import Book
+
+    book = Book.objects.get(pk=book_id)
+    if book.inventory < 1:
+        return False
+    book.inventory -= 1
+    book.save()
+    return True
+
+
+def atomic_reserve(book_id: int) -> bool:
+    from books.inventory import reserve_copy
+    from books.models import Book
+
+    return reserve_copy(Book.objects.get(pk=book_id))
+
+
+def run(reserve, book_id: int, threads: int, attempts: int) -> dict:
+    from django.db import DatabaseError, connection
+
+    results = {"reserved": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            for _ in range(attempts):
+                try:
+                    reserved = reserve(book_id)
+                except DatabaseError:
+                    reserved, error = False, 1
+                else:
+                    error = 0
+                with lock:
+                    results["reserved"] += reserved
+                    results["errors"] += error
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results["seconds"] = time.perf_counter() - start
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument("--stock", type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from books.models import Book
+
+    with test_database(on_disk=True):
+        print(
+            f"{'mode':>8} {'reserved':>9} {'final':>6} {'oversold':>9} "
+            f"{'errors':>7} {'checkouts/s':>12}"
+        )
+        for mode, reserve in (("naive", naive_reserve), ("atomic", atomic_reserve)):
+            book = Book.objects.create(
+                title=f"Bestseller ({mode})",
+                author="Someone",
+                cover="H",
+                inventory=args.stock,
+                daily_fee=1,
+            )
+            results = run(reserve, book.pk, args.threads, args.attempts)
+            book.refresh_from_db()
+            attempts = args.threads * args.attempts
+            oversold = results["reserved"] - (args.stock - book.inventory)
+            print(
+                f"{mode:>8} {results['reserved']:>9} {book.inventory:>6} "
+                f"{oversold:>9} {results['errors']:>7} "
+                f"{attempts / results['seconds']:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
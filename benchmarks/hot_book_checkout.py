@@ -0,0 +1,51 @@
+"""
+Checkout throughput on a single hot book with the stock kept in
+`Book.inventory` versus spread over inventory shards. Row-level locking
+databases (PostgreSQL) benefit from sharding; SQLite locks the whole
+database on write, so expect similar numbers there.
+"""
+import argparse
+
+from benchmarks import setup, test_database
+from benchmarks.checkout_stress import atomic_reserve, run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=8)
+    args = parser.parse_args()
+
+    setup()
+    from books.inventory import available_copies, enable_sharding
+    from books.models import Book
+
+    attempts = args.threads * args.attempts
+    with test_database(on_disk=True):
+        print(
+            f"{'shards':>7} {'reserved':>9} {'left':>6} "
+            f"{'errors':>7} {'checkouts/s':>12}"
+        )
+        for shards in (0, args.shards):
+            book = Book.objects.create(
+                title=f"Hot book ({shards} shards)",
+                author="Someone",
+                cover="H",
+                inventory=attempts,
+                daily_fee=1,
+            )
+            if shards:
+                enable_sharding(book, shard_count=shards)
+
+            results = run(atomic_reserve, book.pk, args.threads, args.attempts)
+            book.refresh_from_db()
+            print(
+                f"{shards:>7} {results['reserved']:>9} "
+                f"{available_copies(book):>6} {results['errors']:>7} "
+                f"{attempts / results['seconds']:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
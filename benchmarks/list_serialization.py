@@ -0,0 +1,103 @@
+"""
+Rows per second when rendering borrowing and payment list pages through
+the DRF model serializers versus the `.values()` fast path, and a check
+that both produce byte-identical JSON.
+"""
+import argparse
+import datetime
+
+from benchmarks import setup, test_database, timed
+
+
+def fill(rows: int) -> None:
+    from django.contrib.auth import get_user_model
+
+    from books.models import Book
+    from borrowings.models import Borrowing
+    from payments.models import Payment
+
+    user = get_user_model().objects.create_user("bench@bench.com", "benchpass")
+    book = Book.objects.create(
+        title="Bench", author="Bench", cover="S", inventory=1, daily_fee=1
+    )
+    borrowings = Borrowing.objects.bulk_create(
+        Borrowing(
+            user=user,
+            book=book,
+            expected_return_date=datetime.date(2022, 12, 15),
+        )
+        for _ in range(rows)
+    )
+    Payment.objects.bulk_create(
+        Payment(
+            status="PENDING",
+            type="PAYMENT",
+            borrowing=borrowing,
+            session_url="https://checkout.stripe.com/pay/bench",
+            session_id=f"cs_{borrowing.pk}",
+            money_to_pay="12.50",
+        )
+        for borrowing in borrowings
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from borrowings.models import Borrowing
+    from borrowings.serializers import (
+        BorrowingListSerializer,
+        borrowing_list_values,
+    )
+    from payments.models import Payment
+    from payments.serializers import PaymentListSerializer, payment_list_values
+
+    cases = (
+        (
+            "borrowings",
+            Borrowing.objects.select_related("book", "user", "payment"),
+            BorrowingListSerializer,
+            borrowing_list_values,
+        ),
+        (
+            "payments",
+            Payment.objects.select_related("borrowing__user"),
+            PaymentListSerializer,
+            payment_list_values,
+        ),
+    )
+    renderer = JSONRenderer()
+
+    with test_database():
+        fill(args.rows)
+        print(f"{'list':>11} {'model rows/s':>13} {'values rows/s':>14} identical")
+        for name, queryset, serializer_class, values_serializer in cases:
+            queryset = queryset.order_by("id")
+            fields = values_serializer.fields
+
+            def model_path():
+                return renderer.render(serializer_class(queryset, many=True).data)
+
+            def values_path():
+                rows = values_serializer.values(queryset, fields, ("id",))
+                return renderer.render(
+                    values_serializer.to_representation(rows, fields)
+                )
+
+            identical = model_path() == values_path()
+            model_ms = timed(model_path, args.repeat)
+            values_ms = timed(values_path, args.repeat)
+            print(
+                f"{name:>11} {args.rows / model_ms * 1000:>13.0f} "
+                f"{args.rows / values_ms * 1000:>14.0f} {identical}"
+            )
+
+
+if __name__ == "__main__":
+    main()
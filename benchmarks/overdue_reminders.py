@@ -0,0 +1,108 @@
+"""
+Overdue reminder task on a large number of overdue loans: the original
+per-row loop that sent one Telegram message per loan and counted in a
+second query, versus the chunked joined scan that queues one digest per
+user in the outbox. Telegram is stubbed, so only database work and the
+number of messages that would be sent are measured.
+"""
+import argparse
+import datetime
+from unittest import mock
+
+from benchmarks import setup, test_database, timed
+
+
+def fill(loans: int, users: int) -> None:
+    from django.contrib.auth import get_user_model
+
+    from books.models import Book
+    from borrowings.models import Borrowing
+
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        user_model(email=f"late{index}@bench.com") for index in range(users)
+    )
+    user_ids = list(user_model.objects.values_list("pk", flat=True))
+    book = Book.objects.create(
+        title="Bench", author="Bench", cover="S", inventory=1, daily_fee=1
+    )
+    due = datetime.date.today() - datetime.timedelta(days=3)
+    Borrowing.objects.bulk_create(
+        (
+            Borrowing(
+                user_id=user_ids[index % users],
+                book=book,
+                expected_return_date=due,
+            )
+            for index in range(loans)
+        ),
+        batch_size=5000,
+    )
+
+
+def per_row_reminders():
+    """The task as it was before digests"""
+    from library_service import telegram_bot
+    from borrowings.models import Borrowing
+
+    borrowings = Borrowing.objects.filter(
+        expected_return_date__lt=datetime.datetime.today(), actual_return_date=None
+    )
+    for borrowing in borrowings:
+        telegram_bot.send_message(
+            "New Borrowing:\n"
+            f"User {borrowing.user} didn't return the book\n"
+            f"Book: {borrowing.book}\n"
+            f"Should be returned in {borrowing.expected_return_date}"
+        )
+    return f"{borrowings.count()} users didn't return the book"
+
+
+def digest_reminders():
+    """The outbox is drained inline after commit, as Celery runs eagerly"""
+    from borrowings.tasks import outdated_borrowings
+
+    return outdated_borrowings()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loans", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    with test_database(), mock.patch(
+        "library_service.telegram_bot.send_message"
+    ) as send_message:
+        fill(args.loans, args.users)
+        print(f"{args.loans} overdue loans of {args.users} users")
+        print(f"{'task':>10} {'queries':>9} {'messages':>9} {'ms':>9}")
+
+        for name, task in (
+            ("per-row", per_row_reminders),
+            ("digest", digest_reminders),
+        ):
+            send_message.reset_mock()
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                ms = timed(task)
+            print(
+                f"{name:>10} {queries.count:>9} "
+                f"{send_message.call_count:>9} {ms:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,36 @@
 from django.contrib import admin
 
+from books.inventory import (
+    available_copies,
+    disable_sharding,
+    enable_sharding,
+    sharded_inventory_subquery,
+)
 from books.models import Book
 
-admin.site.register(Book)
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ("title", "author", "copies", "shard_count")
+    readonly_fields = ("shard_count",)
+    search_fields = ("title", "author")
+    actions = ("enable_inventory_sharding", "disable_inventory_sharding")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            sharded_inventory=sharded_inventory_subquery()
+        )
+
+    @admin.display(description="Copies")
+    def copies(self, book):
+        return available_copies(book)
+
+    @admin.action(description="Shard inventory of selected books (hot titles)")
+    def enable_inventory_sharding(self, request, queryset):
+        for book in queryset:
+            enable_sharding(book)
+
+    @admin.action(description="Stop sharding inventory of selected books")
+    def disable_inventory_sharding(self, request, queryset):
+        for book in queryset:
+            disable_sharding(book)
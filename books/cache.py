@@ -0,0 +1,43 @@
+import hashlib
+
+from django.db import transaction
+
+from library_service.cache import bump_versions, version
+
+BOOK_CACHE_TIMEOUT = 60 * 15
+
+LIST_VERSION_KEY = "books:list:version"
+
+
+def _detail_version_key(book_id) -> str:
+    return f"books:detail:{book_id}:version"
+
+
+def _digest(url: str) -> str:
+    return hashlib.md5(url.encode()).hexdigest()
+
+
+def list_key(url: str) -> str:
+    return f"books:list:{version(LIST_VERSION_KEY)}:{_digest(url)}"
+
+
+def detail_key(book_id, url: str = "") -> str:
+    detail_version = version(_detail_version_key(book_id))
+    return f"books:detail:{book_id}:{detail_version}:{_digest(url)}"
+
+
+def _bump_versions(book_ids) -> None:
+    bump_versions(
+        [LIST_VERSION_KEY, *(_detail_version_key(book_id) for book_id in book_ids)]
+    )
+
+
+def invalidate_books(book_ids=()) -> None:
+    """
+    Drop cached list pages and details of `book_ids`. Versions are bumped
+    right away and again after commit, so a reader that refilled the cache
+    from not yet committed state is discarded as well.
+    """
+    book_ids = list(book_ids)
+    _bump_versions(book_ids)
+    transaction.on_commit(lambda: _bump_versions(book_ids))
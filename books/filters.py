@@ -0,0 +1,39 @@
+from rest_framework.filters import BaseFilterBackend
+
+from books.search import search_books
+
+
+class BookSearchFilter(BaseFilterBackend):
+    """
+    `?search=` over book title and author, backed by the full-text index.
+    While searching, results are ordered by relevance.
+    """
+
+    search_param = "search"
+    default_ordering = ("id",)
+    search_ordering = ("search_rank", "id")
+
+    def get_search_text(self, request):
+        return request.query_params.get(self.search_param, "").strip()
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request)
+        if not text:
+            return queryset
+        return search_books(queryset, text)
+
+    def get_ordering(self, request, queryset, view):
+        if self.get_search_text(request):
+            return self.search_ordering
+        return self.default_ordering
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Search books by title and author prefixes",
+                "schema": {"type": "string"},
+            }
+        ]
@@ -0,0 +1,118 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from books.cache import invalidate_books
+from books.inventory import set_sharded_inventory
+from books.models import Book
+from books.serializers import BookSerializer
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+UPDATE_FIELDS = ("author", "cover", "inventory", "daily_fee")
+
+
+class BookImportSerializer(BookSerializer):
+    """Row validation for the importer; an existing title means update."""
+
+    class Meta(BookSerializer.Meta):
+        extra_kwargs = {"title": {"validators": []}}
+
+
+def guess_format(filename: str):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def read_rows(lines, file_format: str):
+    """Yield `(row_number, data)` pairs from an iterable of text lines."""
+    if file_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(lines), start=1):
+            yield row_number, row
+        return
+
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, None
+
+
+def write_batch(books: dict) -> tuple:
+    """Upsert validated rows keyed by title, return (created, updated)."""
+    with transaction.atomic():
+        existing = {
+            book.title: book
+            for book in Book.objects.filter(title__in=books).only(
+                "id", "title", "shard_count"
+            )
+        }
+        Book.objects.bulk_create(
+            [Book(**data) for data in books.values()],
+            update_conflicts=True,
+            unique_fields=("title",),
+            update_fields=UPDATE_FIELDS,
+        )
+        for title, book in existing.items():
+            if book.shard_count:
+                set_sharded_inventory(book, books[title]["inventory"])
+        invalidate_books(book.pk for book in existing.values())
+
+    return len(books) - len(existing), len(existing)
+
+
+def _next_batch(rows, batch_size: int, report: dict) -> list:
+    try:
+        return list(islice(rows, batch_size))
+    except UnicodeDecodeError:
+        raise ValidationError(
+            "The file is not valid UTF-8 text. Rows before the invalid one "
+            f"were imported: {report['created']} created, "
+            f"{report['updated']} updated."
+        )
+
+
+def import_books(lines, file_format: str, batch_size: int = IMPORT_BATCH_SIZE):
+    """
+    Stream rows from `lines`, validate them and upsert books by title in
+    batches. Only one batch is held in memory at a time.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValidationError(
+            f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+
+    validator = BookImportSerializer()
+    report = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+    rows = read_rows(lines, file_format)
+
+    while batch := _next_batch(rows, batch_size, report):
+        books = {}
+        for row_number, data in batch:
+            try:
+                if not isinstance(data, dict):
+                    raise ValidationError("Row is not a valid object")
+                validated = validator.run_validation(data)
+            except ValidationError as error:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append(
+                        {"row": row_number, "errors": error.detail}
+                    )
+                continue
+            books[validated["title"]] = validated
+
+        if books:
+            created, updated = write_batch(books)
+            report["created"] += created
+            report["updated"] += updated
+
+    return report
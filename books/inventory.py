@@ -0,0 +1,222 @@
+import random
+from collections import Counter
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+
+from books.cache import invalidate_books
+from books.models import Book, BookInventoryShard
+
+DEFAULT_SHARD_COUNT = 8
+
+
+def sharded_inventory_subquery(book: str = ""):
+    """
+    Annotation with the summed shard stock of each sharded book. `book` is
+    the path from the queried model to the book, e.g. `"borrowing__book__"`.
+    """
+    return Case(
+        When(
+            **{f"{book}shard_count__gt": 0},
+            then=Subquery(
+                BookInventoryShard.objects.filter(book=OuterRef(f"{book}pk"))
+                .values("book")
+                .annotate(total=Sum("inventory"))
+                .values("total")
+            ),
+        ),
+        default=None,
+    )
+
+
+def with_book_inventory(queryset, book: str):
+    """
+    Annotate the stock of the related book at `book` (e.g. `"book"`), so a
+    detail response that nests the book needs no query of its own. Hand it
+    to the book with `attach_book_inventory`.
+    """
+    return queryset.annotate(
+        book_sharded_inventory=sharded_inventory_subquery(f"{book}__")
+    )
+
+
+def attach_book_inventory(instance, book: str) -> None:
+    """Hand the `with_book_inventory` annotation to the related book"""
+    if hasattr(instance, "book_sharded_inventory"):
+        related = attrgetter(book.replace("__", "."))(instance)
+        related.sharded_inventory = instance.book_sharded_inventory
+
+
+def available_copies(book: Book) -> int:
+    """
+    Stock of `book`. For sharded books this is the sum of the shards, taken
+    from the `sharded_inventory` annotation when the queryset provides it.
+    """
+    if not book.shard_count:
+        return book.inventory
+
+    total = getattr(book, "sharded_inventory", None)
+    if total is None:
+        total = BookInventoryShard.objects.filter(book=book).aggregate(
+            total=Sum("inventory")
+        )["total"]
+    return total or 0
+
+
+def _spread(total: int, shard_count: int) -> list:
+    base, extra = divmod(total, shard_count)
+    return [base + (shard < extra) for shard in range(shard_count)]
+
+
+def set_sharded_inventory(book: Book, total: int) -> None:
+    """Overwrite the stock of a sharded book, spreading it evenly"""
+    with transaction.atomic():
+        for shard, inventory in enumerate(_spread(total, book.shard_count)):
+            BookInventoryShard.objects.filter(book=book, shard=shard).update(
+                inventory=inventory
+            )
+    invalidate_books([book.pk])
+
+
+def enable_sharding(book: Book, shard_count: int = DEFAULT_SHARD_COUNT) -> None:
+    """Move the stock of `book` into `shard_count` counter rows"""
+    with transaction.atomic():
+        book = Book.objects.select_for_update().get(pk=book.pk)
+        if book.shard_count:
+            return
+
+        BookInventoryShard.objects.bulk_create(
+            BookInventoryShard(book=book, shard=shard, inventory=inventory)
+            for shard, inventory in enumerate(
+                _spread(book.inventory, shard_count)
+            )
+        )
+        book.inventory = 0
+        book.shard_count = shard_count
+        book.save(update_fields=["inventory", "shard_count"])
+
+
+def disable_sharding(book: Book) -> None:
+    """Fold the shards of `book` back into `Book.inventory`"""
+    with transaction.atomic():
+        book = Book.objects.select_for_update().get(pk=book.pk)
+        if not book.shard_count:
+            return
+
+        # Lock the shards so a concurrent reserve or release on one of them
+        # either lands before the fold or finds its row gone and falls back
+        shards = BookInventoryShard.objects.select_for_update().filter(book=book)
+        book.inventory = sum(shard.inventory for shard in shards)
+        book.shard_count = 0
+        book.save(update_fields=["inventory", "shard_count"])
+        BookInventoryShard.objects.filter(book=book).delete()
+
+
+def _reserve_from_shard(book: Book) -> bool:
+    shards = list(
+        BookInventoryShard.objects.filter(
+            book=book, inventory__gt=0
+        ).values_list("pk", flat=True)
+    )
+    random.shuffle(shards)
+    for shard in shards:
+        if BookInventoryShard.objects.filter(pk=shard, inventory__gt=0).update(
+            inventory=F("inventory") - 1
+        ):
+            return True
+    return False
+
+
+def _reserve(book: Book) -> bool:
+    if book.shard_count:
+        return _reserve_from_shard(book)
+    return bool(
+        Book.objects.filter(pk=book.pk, inventory__gt=0).update(
+            inventory=F("inventory") - 1
+        )
+    )
+
+
+def _current_shard_count(pk: int) -> int:
+    return Book.objects.filter(pk=pk).values_list("shard_count", flat=True).get()
+
+
+def reserve_copy(book: Book) -> bool:
+    """
+    Take one copy of `book` with a single conditional UPDATE, so concurrent
+    checkouts can never drive the inventory below zero. Sharded books take
+    the copy from a random shard that still has stock.
+    """
+    reserved = _reserve(book)
+    if not reserved:
+        # Sharding may have been switched on or off after `book` was loaded
+        shard_count = _current_shard_count(book.pk)
+        if bool(shard_count) != bool(book.shard_count):
+            book.shard_count = shard_count
+            reserved = _reserve(book)
+    if reserved:
+        invalidate_books([book.pk])
+    return bool(reserved)
+
+
+def release_copy(book: Book) -> None:
+    released = book.shard_count and BookInventoryShard.objects.filter(
+        book=book, shard=random.randrange(book.shard_count)
+    ).update(inventory=F("inventory") + 1)
+    if not released:
+        # Not sharded, or sharding was switched off after `book` was loaded
+        released = Book.objects.filter(pk=book.pk, shard_count=0).update(
+            inventory=F("inventory") + 1
+        )
+    if not released:
+        # Sharding was switched on after `book` was loaded
+        BookInventoryShard.objects.filter(
+            book=book, shard=random.randrange(_current_shard_count(book.pk))
+        ).update(inventory=F("inventory") + 1)
+    invalidate_books([book.pk])
+
+
+def release_copies(books) -> None:
+    """
+    Put back one copy per entry of `books` (a book may repeat). Unsharded
+    books are all restocked by a single grouped UPDATE.
+    """
+    books = list(books)
+    counts = Counter(book.pk for book in books)
+    shard_counts = {book.pk: book.shard_count for book in books}
+    plain = []
+    for pk, count in counts.items():
+        released = shard_counts[pk] and BookInventoryShard.objects.filter(
+            book_id=pk, shard=random.randrange(shard_counts[pk])
+        ).update(inventory=F("inventory") + count)
+        if not released:
+            plain.append(pk)
+
+    if plain:
+        released = Book.objects.filter(pk__in=plain, shard_count=0).update(
+            inventory=F("inventory")
+            + Case(
+                *(When(pk=pk, then=Value(counts[pk])) for pk in plain),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        if released < len(plain):
+            # Some of them were sharded after they were loaded
+            for pk, shard_count in Book.objects.filter(
+                pk__in=plain, shard_count__gt=0
+            ).values_list("pk", "shard_count"):
+                BookInventoryShard.objects.filter(
+                    book_id=pk, shard=random.randrange(shard_count)
+                ).update(inventory=F("inventory") + counts[pk])
+    invalidate_books(list(counts))
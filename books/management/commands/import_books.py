@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from books.importers import IMPORT_BATCH_SIZE, guess_format, import_books
+
+
+class Command(BaseCommand):
+    help = "Upsert books by title from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "jsonl"))
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or guess_format(options["path"])
+
+        try:
+            with open(options["path"], encoding="utf-8", newline="") as lines:
+                report = import_books(
+                    lines, file_format, batch_size=options["batch_size"]
+                )
+        except (OSError, ValidationError) as error:
+            raise CommandError(error)
+
+        for error in report["errors"]:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {report['created']}, updated {report['updated']}, "
+                f"failed {report['failed']}"
+            )
+        )
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from books.search import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_alter_book_inventory"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from books.search import create_search_index
+
+
+def restore_search_index(apps, schema_editor):
+    # SQLite rebuilds the books table to add the column, dropping triggers
+    create_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_book_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="shard_count",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="Number of inventory shards, 0 keeps the stock in `inventory`",
+            ),
+        ),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="BookInventoryShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("inventory", models.PositiveIntegerField(default=0)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory_shards",
+                        to="books.book",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="bookinventoryshard",
+            constraint=models.UniqueConstraint(
+                fields=("book", "shard"), name="unique_book_inventory_shard"
+            ),
+        ),
+    ]
@@ -23,6 +23,32 @@ class Book(models.Model):
     daily_fee = models.DecimalField(
         max_digits=5, decimal_places=2, validators=[validate_positive]
     )
+    shard_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=_(
+            "Number of inventory shards, 0 keeps the stock in `inventory`"
+        ),
+    )
 
     def __str__(self):
         return self.title
+
+
+class BookInventoryShard(models.Model):
+    """One slice of a sharded book's stock, see `books.inventory`"""
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="inventory_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    inventory = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "shard"], name="unique_book_inventory_shard"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.book} #{self.shard}: {self.inventory}"
@@ -0,0 +1,119 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from books.models import Book
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+BOOK_TABLE = Book._meta.db_table
+FTS_TABLE = f"{BOOK_TABLE}_fts"
+PG_INDEX = f"{BOOK_TABLE}_search_idx"
+PG_DOCUMENT = (
+    f"to_tsvector('simple', \"{BOOK_TABLE}\".\"title\" "
+    f"|| ' ' || \"{BOOK_TABLE}\".\"author\")"
+)
+
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, author, content='{BOOK_TABLE}', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {BOOK_TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    f"VALUES (new.id, new.title, new.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {BOOK_TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    f"VALUES ('delete', old.id, old.title, old.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    f"AFTER UPDATE OF title, author ON {BOOK_TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    f"VALUES ('delete', old.id, old.title, old.author); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    f"VALUES (new.id, new.title, new.author); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+PG_CREATE = (
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {BOOK_TABLE} "
+    f"USING gin ({PG_DOCUMENT})",
+)
+PG_DROP = (f"DROP INDEX IF EXISTS {PG_INDEX}",)
+
+
+def create_search_index(schema_editor) -> None:
+    """
+    Build the full-text index for books. SQLite keeps an FTS5 table in sync
+    through triggers, PostgreSQL uses an expression GIN index that is
+    maintained by the database itself. Safe to run again, e.g. after a
+    migration had to rebuild the books table on SQLite.
+    """
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_CREATE, "postgresql": PG_CREATE}
+    for statement in statements.get(vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_DROP, "postgresql": PG_DROP}
+    for statement in statements.get(vendor, ()):
+        schema_editor.execute(statement)
+
+
+def search_books(queryset, text: str):
+    """
+    Filter books whose title or author contains every word of `text` as a
+    prefix. Adds a `search_rank` annotation where lower means more relevant.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return queryset.annotate(search_rank=Value(0.0, FloatField()))
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "sqlite":
+        match = " ".join(f'"{word}"*' for word in words)
+        return queryset.filter(
+            RawSQL(
+                f'"{BOOK_TABLE}"."id" IN '
+                f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+                (match,),
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f'AND rowid = "{BOOK_TABLE}"."id"',
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        return queryset.filter(
+            RawSQL(
+                f"{PG_DOCUMENT} @@ to_tsquery('simple', %s)",
+                (tsquery,),
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"-ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))",
+                (tsquery,),
+                output_field=FloatField(),
+            )
+        )
+
+    condition = Q()
+    for word in words:
+        condition &= Q(title__icontains=word) | Q(author__icontains=word)
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, FloatField())
+    )
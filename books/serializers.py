@@ -1,8 +1,99 @@
+import datetime
+
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
+
+from books.inventory import available_copies, set_sharded_inventory
+from library_service.sparse_fields import SparseFieldsMixin
+from library_service.values_serializers import ValuesSerializer
 from .models import Book
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    available = serializers.SerializerMethodField()
+    on_loan = serializers.SerializerMethodField()
+    next_available_date = serializers.SerializerMethodField()
+
     class Meta:
         model = Book
-        fields = ("id", "title", "author", "cover", "inventory", "daily_fee")
+        fields = (
+            "id",
+            "title",
+            "author",
+            "cover",
+            "inventory",
+            "daily_fee",
+            "available",
+            "on_loan",
+            "next_available_date",
+        )
+
+    @staticmethod
+    def _loan_summary(book):
+        """Summary row joined by `loan_summary`, None for never borrowed"""
+        try:
+            return book.loan_summary
+        except ObjectDoesNotExist:
+            return None
+
+    def get_available(self, book) -> int:
+        return available_copies(book)
+
+    def get_on_loan(self, book) -> int:
+        summary = self._loan_summary(book)
+        return summary.active_loans if summary else 0
+
+    def get_next_available_date(self, book) -> datetime.date | None:
+        """Today while copies are on the shelf, else the earliest due date"""
+        if available_copies(book) > 0:
+            return datetime.date.today()
+        summary = self._loan_summary(book)
+        return summary.next_return_date if summary else None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if "inventory" in data:
+            data["inventory"] = available_copies(instance)
+        return data
+
+    def update(self, instance, validated_data):
+        if instance.shard_count and "inventory" in validated_data:
+            set_sharded_inventory(instance, validated_data.pop("inventory"))
+            instance.sharded_inventory = None
+        return super().update(instance, validated_data)
+
+
+COPIES_PATHS = ("inventory", "shard_count", "sharded_inventory")
+
+
+def _copies(row) -> int:
+    """`available_copies` over a `values()` row"""
+    if row["shard_count"]:
+        return row["sharded_inventory"] or 0
+    return row["inventory"]
+
+
+def _next_available_date(row):
+    if _copies(row) > 0:
+        return datetime.date.today()
+    return row["loan_summary__next_return_date"]
+
+
+book_list_values = ValuesSerializer(
+    BookSerializer,
+    mappers={
+        "inventory": _copies,
+        "available": _copies,
+        "on_loan": lambda row: row["loan_summary__active_loans"] or 0,
+        "next_available_date": _next_available_date,
+    },
+    mapper_paths={
+        "inventory": COPIES_PATHS,
+        "available": COPIES_PATHS,
+        "on_loan": ("loan_summary__active_loans",),
+        "next_available_date": (
+            *COPIES_PATHS,
+            "loan_summary__next_return_date",
+        ),
+    },
+)
@@ -1,5 +1,9 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -7,6 +11,7 @@ from rest_framework import status
 
 from books.models import Book
 from books.serializers import BookSerializer
+from library_service.pagination import IdCursorPagination
 
 BOOK_URL = reverse("books:book-list")
 PAYLOAD = {
@@ -48,7 +53,7 @@ class UnauthenticatedBookApiTests(TestCase):
         serializer = BookSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_retrieve_movie_detail(self):
         book = sample_book()
@@ -100,7 +105,7 @@ class AuthenticatedBookApiTests(TestCase):
         serializer = BookSerializer(books, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_retrieve_movie_detail(self):
         book = sample_book()
@@ -163,3 +168,139 @@ class AdminBookApiTests(TestCase):
         url = detail_url(book.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class BookPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for index in range(5):
+            sample_book(title=f"Book {index}")
+
+    def test_list_is_cursor_paginated(self):
+        res = self.client.get(BOOK_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIsNotNone(res.data["next"])
+        self.assertNotIn("count", res.data)
+
+    def test_cursor_walks_all_books_in_id_order(self):
+        titles = []
+        url = BOOK_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            titles.extend(book["title"] for book in res.data["results"])
+            url = res.data["next"]
+
+        self.assertEqual(
+            titles,
+            list(Book.objects.order_by("id").values_list("title", flat=True)),
+        )
+
+    def test_estimated_count(self):
+        res = self.client.get(BOOK_URL, {"count": "estimated"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 5)
+        self.assertFalse(res.data["count_is_estimate"])
+
+    def test_estimated_count_flags_the_cap(self):
+        with mock.patch.object(IdCursorPagination, "estimated_count_cap", 3):
+            res = self.client.get(BOOK_URL, {"count": "estimated"})
+
+        self.assertEqual(res.data["count"], 3)
+        self.assertTrue(res.data["count_is_estimate"])
+
+
+class BookSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dune = sample_book(title="Dune", author="Frank Herbert")
+        self.messiah = sample_book(title="Dune Messiah", author="Frank Herbert")
+        self.hobbit = sample_book(title="The Hobbit", author="J. R. R. Tolkien")
+
+    def search(self, text):
+        res = self.client.get(BOOK_URL, {"search": text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in res.data["results"]]
+
+    def test_search_by_title(self):
+        self.assertCountEqual(
+            self.search("dune"), [self.dune.id, self.messiah.id]
+        )
+
+    def test_search_by_author_prefix(self):
+        self.assertEqual(self.search("tolk"), [self.hobbit.id])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.search("dune mess"), [self.messiah.id])
+
+    def test_search_ranks_better_matches_first(self):
+        sample_book(title="Herbert notes", author="Dune fan")
+
+        self.assertEqual(
+            self.search("dune herbert")[:2], [self.dune.id, self.messiah.id]
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.hobbit.title = "The Silmarillion"
+        self.hobbit.save()
+        self.messiah.delete()
+
+        self.assertEqual(self.search("silmar"), [self.hobbit.id])
+        self.assertEqual(self.search("hobbit"), [])
+        self.assertEqual(self.search("messiah"), [])
+
+
+class BookExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@admin.com", "testpassword"
+        )
+        self.client.force_authenticate(self.admin)
+        sample_book(title="Test1")
+        sample_book(title="Test2")
+
+    def test_export_csv(self):
+        res = self.client.get(reverse("books:book-export"), {"type": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], "id,title,author,cover,inventory,daily_fee,on_loan"
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertIn("Test2", lines[2])
+
+    def test_export_forbidden_for_regular_user(self):
+        user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(reverse("books:book-export"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BookSparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = sample_book()
+
+    def test_list_only_requested_fields(self):
+        res = self.client.get(BOOK_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            res.data["results"], [{"id": self.book.id, "title": "Test book"}]
+        )
+
+    def test_detail_omits_fields_and_summary_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                detail_url(self.book.id), {"omit": "on_loan,next_available_date"}
+            )
+
+        self.assertNotIn("on_loan", res.data)
+        self.assertIn("available", res.data)
+        self.assertNotIn("loan_summary", queries.captured_queries[-1]["sql"])
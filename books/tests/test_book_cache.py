@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.tests.test_book_api import BOOK_URL, detail_url, sample_book
+
+
+class BookCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.book = sample_book()
+
+    def test_list_served_from_cache(self):
+        self.client.get(BOOK_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["id"], self.book.id)
+
+    def test_detail_served_from_cache(self):
+        self.client.get(detail_url(self.book.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(res.data["title"], self.book.title)
+
+    def test_save_invalidates_list_and_detail(self):
+        self.client.get(BOOK_URL)
+        self.client.get(detail_url(self.book.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.inventory = 7
+            self.book.save()
+
+        res = self.client.get(BOOK_URL)
+        self.assertEqual(res.data["results"][0]["inventory"], 7)
+        res = self.client.get(detail_url(self.book.id))
+        self.assertEqual(res.data["inventory"], 7)
+
+    def test_delete_invalidates_list(self):
+        self.client.get(BOOK_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.delete()
+
+        res = self.client.get(BOOK_URL)
+        self.assertEqual(res.data["results"], [])
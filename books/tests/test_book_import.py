@@ -0,0 +1,113 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.importers import import_books
+from books.models import Book
+from books.tests.test_book_api import sample_book
+
+IMPORT_URL = reverse("books:book-import-books")
+
+CSV_DATA = (
+    "title,author,cover,inventory,daily_fee\n"
+    "Dune,Frank Herbert,H,3,1.50\n"
+    "Test book,New Author,S,9,2.00\n"
+    "Broken,Someone,X,-1,1.00\n"
+)
+JSONL_DATA = (
+    '{"title": "Dune", "author": "Frank Herbert", "cover": "H", '
+    '"inventory": 3, "daily_fee": "1.50"}\n'
+    "not json\n"
+)
+
+
+class BookImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@admin.com", "testpassword"
+        )
+        self.client.force_authenticate(self.admin)
+        self.book = sample_book()
+
+    def upload(self, name, content, **params):
+        return self.client.post(
+            IMPORT_URL + (f"?type={params['type']}" if params else ""),
+            {
+                "file": SimpleUploadedFile(
+                    name,
+                    content if isinstance(content, bytes) else content.encode(),
+                )
+            },
+            format="multipart",
+        )
+
+    def test_import_csv_upserts_by_title(self):
+        res = self.upload("books.csv", CSV_DATA)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["updated"], 1)
+        self.assertEqual(res.data["failed"], 1)
+        self.assertEqual(res.data["errors"][0]["row"], 3)
+        self.assertIn("cover", res.data["errors"][0]["errors"])
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.author, "New Author")
+        self.assertEqual(self.book.inventory, 9)
+        self.assertTrue(Book.objects.filter(title="Dune").exists())
+
+    def test_import_jsonl_reports_broken_lines(self):
+        res = self.upload("books.txt", JSONL_DATA, type="jsonl")
+
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["errors"][0]["row"], 2)
+
+    def test_import_small_batches(self):
+        report = import_books(StringIO(CSV_DATA), "csv", batch_size=1)
+
+        self.assertEqual((report["created"], report["updated"]), (1, 1))
+
+    def test_unknown_format_rejected(self):
+        res = self.upload("books.xml", CSV_DATA)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_utf8_upload_rejected(self):
+        content = CSV_DATA.replace("Dune", "Düne").encode("latin-1")
+
+        res = self.upload("books.csv", content)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("UTF-8", str(res.data))
+
+    def test_import_forbidden_for_regular_user(self):
+        user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(user)
+
+        res = self.upload("books.csv", CSV_DATA)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(CSV_DATA)
+            file.flush()
+            out = StringIO()
+            call_command("import_books", file.name, stdout=out, stderr=StringIO())
+
+        self.assertIn("Created 1, updated 1, failed 1", out.getvalue())
+
+    def test_import_command_reports_non_utf8_file(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".csv") as file:
+            file.write("title\nDüne\n".encode("latin-1"))
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "not valid UTF-8"):
+                call_command("import_books", file.name, stdout=StringIO())
@@ -0,0 +1,159 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+
+from books.inventory import (
+    available_copies,
+    disable_sharding,
+    enable_sharding,
+    release_copies,
+    release_copy,
+    reserve_copy,
+)
+from books.models import Book, BookInventoryShard
+from books.tests.test_book_api import detail_url, sample_book
+
+
+class InventoryTests(TestCase):
+    def test_reserve_decrements_inventory(self):
+        book = sample_book(inventory=2)
+
+        self.assertTrue(reserve_copy(book))
+
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+    def test_reserve_fails_without_stock(self):
+        book = sample_book(inventory=0)
+
+        self.assertFalse(reserve_copy(book))
+
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+
+    def test_release_increments_inventory(self):
+        book = sample_book(inventory=0)
+
+        release_copy(book)
+
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentReservationTests(TransactionTestCase):
+    def test_parallel_checkouts_never_oversell(self):
+        book = sample_book(inventory=5)
+        results = []
+
+        def checkout():
+            try:
+                results.append(reserve_copy(book))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        book.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(book.inventory, 0)
+
+
+class ShardedInventoryTests(TestCase):
+    def setUp(self):
+        self.book = sample_book(inventory=10)
+        enable_sharding(self.book, shard_count=4)
+        self.book.refresh_from_db()
+
+    def test_enable_spreads_stock_over_shards(self):
+        self.assertEqual(self.book.shard_count, 4)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(
+            sorted(
+                BookInventoryShard.objects.filter(book=self.book).values_list(
+                    "inventory", flat=True
+                )
+            ),
+            [2, 2, 3, 3],
+        )
+        self.assertEqual(available_copies(self.book), 10)
+
+    def test_reserve_until_every_shard_is_empty(self):
+        for _ in range(10):
+            self.assertTrue(reserve_copy(self.book))
+
+        self.assertFalse(reserve_copy(self.book))
+        self.assertEqual(available_copies(self.book), 0)
+
+    def test_release_returns_copy_to_a_shard(self):
+        reserve_copy(self.book)
+        release_copy(self.book)
+
+        self.assertEqual(available_copies(self.book), 10)
+
+    def test_disable_folds_shards_back(self):
+        reserve_copy(self.book)
+
+        disable_sharding(self.book)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.shard_count, 0)
+        self.assertEqual(self.book.inventory, 9)
+        self.assertFalse(BookInventoryShard.objects.exists())
+
+    def test_stale_sharded_instance_reserves_after_disable(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        disable_sharding(self.book)
+
+        self.assertTrue(reserve_copy(stale))
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 9)
+
+    def test_stale_sharded_instance_releases_after_disable(self):
+        reserve_copy(self.book)
+        stale = Book.objects.get(pk=self.book.pk)
+        disable_sharding(self.book)
+
+        release_copy(stale)
+        release_copies([stale])
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 11)
+
+    def test_stale_plain_instance_reserves_and_releases_after_enable(self):
+        book = sample_book(title="Plain", inventory=4)
+        stale = Book.objects.get(pk=book.pk)
+        enable_sharding(book, shard_count=2)
+
+        self.assertTrue(reserve_copy(stale))
+        stale.shard_count = 0
+        release_copy(stale)
+        release_copies([stale, stale])
+
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(available_copies(book), 6)
+
+    def test_api_reports_and_updates_total_stock(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                "admin@admin.com", "testpassword"
+            )
+        )
+        url = detail_url(self.book.id)
+
+        self.assertEqual(client.get(url).data["inventory"], 10)
+
+        res = client.patch(url, {"inventory": 6})
+
+        self.assertEqual(res.data["inventory"], 6)
+        self.assertEqual(available_copies(self.book), 6)
@@ -1,11 +1,109 @@
-from rest_framework import viewsets
+import codecs
 
+from django.db.models.functions import Coalesce
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from books import cache as book_cache
+from books.filters import BookSearchFilter
+from books.importers import guess_format, import_books
+from books.inventory import sharded_inventory_subquery
 from books.models import Book
 from books.permissions import IsAdminOrReadOnly
-from books.serializers import BookSerializer
+from books.serializers import BookSerializer, book_list_values
+from library_service.cache import get_or_compute
+from library_service.exports import stream_export
+from library_service.pagination import IdCursorPagination
+from library_service.sparse_fields import sparse_related
+from library_service.values_serializers import ValuesListMixin
 
 
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.all()
+class BookViewSet(ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Book.objects.annotate(
+        sharded_inventory=sharded_inventory_subquery()
+    )
     serializer_class = BookSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    pagination_class = IdCursorPagination
+    filter_backends = (BookSearchFilter,)
+    values_serializer = book_list_values
+    sparse_relations = {
+        "on_loan": ("loan_summary",),
+        "next_available_date": ("loan_summary",),
+    }
+
+    def get_queryset(self):
+        related = sparse_related(self.request, self.sparse_relations)
+        if not related:
+            return self.queryset
+        return self.queryset.select_related(*related)
+
+    def list(self, request, *args, **kwargs):
+        data = get_or_compute(
+            book_cache.list_key(request.build_absolute_uri()),
+            lambda: super(BookViewSet, self).list(
+                request, *args, **kwargs
+            ).data,
+            book_cache.BOOK_CACHE_TIMEOUT,
+        )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = get_or_compute(
+            book_cache.detail_key(kwargs["pk"], request.get_full_path()),
+            lambda: super(BookViewSet, self).retrieve(
+                request, *args, **kwargs
+            ).data,
+            book_cache.BOOK_CACHE_TIMEOUT,
+        )
+        return Response(data)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        permission_classes=(IsAdminUser,),
+        parser_classes=(MultiPartParser,),
+    )
+    def import_books(self, request):
+        """Upsert books by title from an uploaded CSV or JSONL file"""
+        uploaded = request.FILES.get("file")
+        if uploaded is None:
+            raise ValidationError({"file": "Upload a CSV or JSONL file"})
+
+        file_format = request.query_params.get("type") or guess_format(
+            uploaded.name
+        )
+        report = import_books(codecs.iterdecode(uploaded, "utf-8"), file_format)
+
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        permission_classes=(IsAdminUser,),
+    )
+    def export(self, request):
+        """Stream the catalog as NDJSON (default) or CSV with `?type=csv`"""
+        columns = {
+            "id": "id",
+            "title": "title",
+            "author": "author",
+            "cover": "cover",
+            "inventory": "copies",
+            "daily_fee": "daily_fee",
+            "on_loan": "loan_summary__active_loans",
+        }
+        return stream_export(
+            self.filter_queryset(self.get_queryset()).annotate(
+                copies=Coalesce("sharded_inventory", "inventory")
+            ),
+            columns,
+            request.query_params.get("type", "ndjson"),
+            "books",
+        )
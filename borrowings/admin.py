@@ -1,5 +1,11 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import AccruedFine, Borrowing
 
 admin.site.register(Borrowing)
+
+
+@admin.register(AccruedFine)
+class AccruedFineAdmin(admin.ModelAdmin):
+    list_display = ("borrowing", "overdue_since", "daily_fine", "amount")
+    list_select_related = ("borrowing__book",)
@@ -0,0 +1,158 @@
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Value
+
+from borrowings.cache import invalidate_summaries
+from borrowings.models import AccruedFine, ArchivedBorrowing, Borrowing
+from payments.models import ArchivedPayment, Payment
+
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_BATCH_SIZE = 1000
+
+BORROWING_FIELDS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "user_id",
+    "book_id",
+)
+PAYMENT_FIELDS = (
+    "id",
+    "status",
+    "type",
+    "borrowing_id",
+    "session_url",
+    "session_id",
+    "session_expires_at",
+    "money_to_pay",
+)
+HISTORY_FIELDS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "book_id",
+    "book__title",
+    "payment__status",
+    "payment__type",
+    "payment__money_to_pay",
+)
+
+
+def archivable(older_than_days: int = ARCHIVE_AFTER_DAYS):
+    """Loans returned before the cutoff that no longer owe anything"""
+    cutoff = datetime.date.today() - datetime.timedelta(days=older_than_days)
+    return Borrowing.objects.filter(actual_return_date__lt=cutoff).exclude(
+        payment__status="PENDING"
+    )
+
+
+def claim_batch(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+):
+    """
+    Ids of the next archivable loans, locked for the running transaction.
+    Only the borrowing rows are locked: the payment join of `archivable`
+    is an outer join, whose nullable side PostgreSQL refuses to lock.
+    """
+    return (
+        archivable(older_than_days)
+        .select_for_update(skip_locked=True, of=("self",))
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+
+
+def _delete_rows(model, column: str, ids) -> None:
+    """
+    Plain DELETE of the rows of `model` whose `column` is in `ids`. Unlike
+    QuerySet.delete() it does not load every row to cascade and send the
+    delete signals, so it is only for rows whose dependants are gone.
+    """
+    quote_name = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote_name(model._meta.db_table)} "
+            f"WHERE {quote_name(column)} IN ({placeholders})",
+            ids,
+        )
+
+
+def archive_batch(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Move up to `batch_size` archivable loans and their payments to the
+    archive tables in one transaction. Returns how many were moved.
+    """
+    with transaction.atomic():
+        ids = list(claim_batch(older_than_days, batch_size))
+        if not ids:
+            return 0
+
+        borrowings = Borrowing.objects.filter(id__in=ids)
+        ArchivedBorrowing.objects.bulk_create(
+            (
+                ArchivedBorrowing(**row)
+                for row in borrowings.values(*BORROWING_FIELDS)
+            ),
+            ignore_conflicts=True,
+        )
+        payments = Payment.objects.filter(borrowing_id__in=ids)
+        ArchivedPayment.objects.bulk_create(
+            (ArchivedPayment(**row) for row in payments.values(*PAYMENT_FIELDS)),
+            ignore_conflicts=True,
+        )
+
+        # Settled payments leave the balances as they are, so only the
+        # summaries need refreshing, once per user
+        user_ids = set(borrowings.values_list("user_id", flat=True))
+        # Nothing refers to accrued fines and they have no signals, so this
+        # is a single DELETE
+        AccruedFine.objects.filter(borrowing_id__in=ids).delete()
+        _delete_rows(Payment, "borrowing_id", ids)
+        _delete_rows(Borrowing, "id", ids)
+        invalidate_summaries(user_ids)
+    return len(ids)
+
+
+def archive_returned(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: int = None,
+) -> int:
+    """
+    Archive loans batch by batch. Every batch commits on its own, so an
+    interrupted run keeps its progress and the next one picks up the rest.
+    """
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(older_than_days, batch_size)
+        if not moved:
+            break
+        archived += moved
+        batches += 1
+    return archived
+
+
+def borrowing_history(user_id: int):
+    """
+    Every loan of a user, hot and archived, newest first, as `values()`
+    rows with an `archived` flag.
+    """
+    hot = (
+        Borrowing.objects.filter(user_id=user_id)
+        .values(*HISTORY_FIELDS)
+        .annotate(archived=Value(False, BooleanField()))
+    )
+    cold = (
+        ArchivedBorrowing.objects.filter(user_id=user_id)
+        .values(*HISTORY_FIELDS)
+        .annotate(archived=Value(True, BooleanField()))
+    )
+    return hot.union(cold, all=True).order_by("-borrow_date", "-id")
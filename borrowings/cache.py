@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+
+SUMMARY_CACHE_TIMEOUT = 60 * 15
+
+
+def summary_key(user_id: int) -> str:
+    # Loans turn overdue at midnight, so every day starts with a fresh key
+    return f"borrowings:summary:{user_id}:{datetime.date.today()}"
+
+
+def invalidate_summaries(user_ids) -> None:
+    """
+    Drop the cached summaries of `user_ids` right away and again after
+    commit, like `books.cache.invalidate_books`.
+    """
+    user_ids = set(user_ids)
+
+    def delete():
+        cache.delete_many([summary_key(user_id) for user_id in user_ids])
+
+    delete()
+    transaction.on_commit(delete)
@@ -0,0 +1,126 @@
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from books.cache import invalidate_books
+from books.inventory import release_copies
+from borrowings.models import Hold
+from notifications.outbox import notify_many
+
+HOLD_PICKUP_DAYS = 3
+
+
+def queue_position():
+    """Annotation with the 1-based place of waiting holds in their queue"""
+    ahead = (
+        Hold.objects.filter(book=OuterRef("book"), status=Hold.Status.WAITING)
+        .filter(
+            Q(created_at__lt=OuterRef("created_at"))
+            | Q(created_at=OuterRef("created_at"), id__lt=OuterRef("id"))
+        )
+        .values("book")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return Case(
+        When(
+            status=Hold.Status.WAITING,
+            then=Coalesce(Subquery(ahead), 0) + Value(1),
+        ),
+        default=None,
+    )
+
+
+def allocate_copies(books) -> list:
+    """
+    Hand copies coming back (one per entry of `books`) to the oldest
+    waiting holds of each book and queue a notification for their users.
+    Call inside the return transaction. Returns the books whose copies
+    nobody waits for, which go back to the shelf.
+    """
+    books = list(books)
+    free = Counter(book.pk for book in books)
+    waiting = (
+        Hold.objects.select_for_update(of=("self",), skip_locked=True)
+        .filter(book_id__in=free, status=Hold.Status.WAITING)
+        .order_by("book_id", "created_at", "id")
+        .values_list("id", "book_id", "user__email", "book__title")
+    )
+
+    now = timezone.now()
+    pickup_until = (now + datetime.timedelta(days=HOLD_PICKUP_DAYS)).date()
+    granted = []
+    granted_books = set()
+    messages = []
+    for hold_id, book_id, email, title in waiting:
+        if not free[book_id]:
+            continue
+        free[book_id] -= 1
+        granted.append(hold_id)
+        granted_books.add(book_id)
+        messages.append(
+            (
+                f"hold-ready:{hold_id}",
+                "Hold ready:\n"
+                f"User: {email}\n"
+                f"Book: {title}\n"
+                f"Borrow it until {pickup_until}",
+            )
+        )
+
+    if granted:
+        Hold.objects.filter(id__in=granted).update(
+            status=Hold.Status.READY, ready_at=now
+        )
+        notify_many(messages)
+        invalidate_books(granted_books)
+
+    unclaimed = []
+    for book in books:
+        if free[book.pk]:
+            free[book.pk] -= 1
+            unclaimed.append(book)
+    return unclaimed
+
+
+def return_copies(books) -> None:
+    """Give back one copy per entry of `books`, holds first"""
+    unclaimed = allocate_copies(books)
+    if unclaimed:
+        release_copies(unclaimed)
+
+
+def cancel_hold(hold: Hold) -> None:
+    """Drop a hold, passing a copy set aside for it down the queue"""
+    with transaction.atomic():
+        # A concurrent return may have made `hold` ready since it was read
+        hold = (
+            Hold.objects.select_for_update(of=("self",))
+            .select_related("book")
+            .filter(pk=hold.pk)
+            .first()
+        )
+        if hold is None:
+            return
+        hold.delete()
+        if hold.status == Hold.Status.READY:
+            return_copies([hold.book])
+
+
+def expire_ready_holds() -> int:
+    """Pass on copies that were not borrowed within `HOLD_PICKUP_DAYS`"""
+    cutoff = timezone.now() - datetime.timedelta(days=HOLD_PICKUP_DAYS)
+    with transaction.atomic():
+        expired = list(
+            Hold.objects.select_for_update(of=("self",), skip_locked=True)
+            .select_related("book")
+            .filter(status=Hold.Status.READY, ready_at__lt=cutoff)
+        )
+        Hold.objects.filter(id__in=[hold.id for hold in expired]).delete()
+        if expired:
+            return_copies(hold.book for hold in expired)
+    return len(expired)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from borrowings.archive import (
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    archive_returned,
+)
+
+
+class Command(BaseCommand):
+    help = "Move loans returned more than --days ago to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches, a later run resumes",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_returned(
+            options["days"], options["batch_size"], options["max_batches"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} borrowings"))
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_summaries(apps, schema_editor):
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    BookLoanSummary = apps.get_model("borrowings", "BookLoanSummary")
+    active = models.Q(actual_return_date__isnull=True)
+
+    BookLoanSummary.objects.bulk_create(
+        BookLoanSummary(
+            book_id=row["book"],
+            active_loans=row["active_loans"],
+            total_loans=row["total_loans"],
+            next_return_date=row["next_return_date"],
+        )
+        for row in Borrowing.objects.values("book").annotate(
+            active_loans=models.Count("id", filter=active),
+            total_loans=models.Count("id"),
+            next_return_date=models.Min("expected_return_date", filter=active),
+        ).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_inventory_shards"),
+        ("borrowings", "0004_borrowing_borrow_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookLoanSummary",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="loan_summary",
+                        serialize=False,
+                        to="books.book",
+                    ),
+                ),
+                ("active_loans", models.PositiveIntegerField(default=0)),
+                ("total_loans", models.PositiveIntegerField(default=0)),
+                ("next_return_date", models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0006_active_loan_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccruedFine",
+            fields=[
+                (
+                    "borrowing",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="accrued_fine",
+                        serialize=False,
+                        to="borrowings.borrowing",
+                    ),
+                ),
+                ("overdue_since", models.DateField()),
+                ("daily_fine", models.DecimalField(decimal_places=2, max_digits=6)),
+            ],
+        ),
+    ]
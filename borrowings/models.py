@@ -2,6 +2,8 @@ import datetime
 
 from django.conf import settings
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+
 from books.models import Book
 
 
@@ -26,8 +28,149 @@ class Borrowing(models.Model):
     )
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="borrowings")
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["borrow_date", "id"],
+                name="borrowing_borrow_date_id_idx",
+            ),
+            # Active loans of a user (checkout, "my borrowings")
+            models.Index(
+                fields=["user"],
+                condition=models.Q(actual_return_date=None),
+                name="borrowing_active_user_idx",
+            ),
+            # Active loans by due date (overdue reminders)
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date=None),
+                name="borrowing_active_due_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return (
             f"Book {self.book.title}, Borrow date: {self.borrow_date}."
             f"Please, return until: {self.expected_return_date}"
         )
+
+
+class BookLoanSummary(models.Model):
+    """
+    Denormalized loan counters of a book, maintained by
+    `borrowings.summaries` inside the borrow and return transactions.
+    """
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="loan_summary",
+    )
+    active_loans = models.PositiveIntegerField(default=0)
+    total_loans = models.PositiveIntegerField(default=0)
+    next_return_date = models.DateField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.book}: {self.active_loans} on loan"
+
+
+class AccruedFine(models.Model):
+    """
+    Fine building up on an overdue loan that is still out, refreshed by the
+    nightly `accrue_fines` task. Rows store the terms of the fine rather
+    than its amount, so they only change when the loan does.
+    """
+
+    borrowing = models.OneToOneField(
+        Borrowing,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="accrued_fine",
+    )
+    overdue_since = models.DateField()
+    daily_fine = models.DecimalField(max_digits=6, decimal_places=2)
+
+    def amount_on(self, date: datetime.date):
+        days_overdue = max((date - self.overdue_since).days, 0)
+        return self.daily_fine * days_overdue
+
+    @property
+    def amount(self):
+        return self.amount_on(datetime.date.today())
+
+    def __str__(self) -> str:
+        return f"{self.borrowing_id}: {self.amount}"
+
+
+class ArchivedBorrowing(models.Model):
+    """
+    Cold copy of a returned `Borrowing`, moved here by `borrowings.archive`
+    with its original id so the hot table only holds recent loans.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name="archived_borrowings",
+    )
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="archived_borrowings"
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "borrow_date"],
+                name="archived_borrowing_user_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"Book {self.book.title}, Borrow date: {self.borrow_date}, "
+            f"returned: {self.actual_return_date}"
+        )
+
+
+class Hold(models.Model):
+    """
+    Place of a user in the FIFO waitlist of a book. Returned copies go to
+    the oldest waiting hold, which turns `READY` until the user borrows the
+    copy, see `borrowings.holds`.
+    """
+
+    class Status(models.TextChoices):
+        WAITING = "WAITING", _("Waiting")
+        READY = "READY", _("Ready")
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="holds"
+    )
+    status = models.CharField(
+        max_length=7, choices=Status.choices, default=Status.WAITING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "user"], name="hold_unique_book_user"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["book", "status", "created_at", "id"],
+                name="hold_queue_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} waits for {self.book} ({self.status})"
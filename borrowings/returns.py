@@ -0,0 +1,119 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Value, When
+
+from borrowings.cache import invalidate_summaries
+from borrowings.holds import return_copies
+from borrowings.models import Borrowing
+from borrowings.summaries import record_returns
+from payments.balances import adjust_balance
+from payments.models import Payment
+from payments.tasks import schedule_payment_sessions
+
+FINE_MULTIPLIER = 2
+
+
+def fine_for(borrowing: Borrowing, return_date) -> Decimal:
+    days_of_overdue = (return_date - borrowing.expected_return_date).days
+    return borrowing.book.daily_fee * days_of_overdue * FINE_MULTIPLIER
+
+
+def _charge_fines(overdue: list, return_date) -> list:
+    """
+    Turn the payments of overdue loans into pending fines. A borrowing has
+    a single payment, so existing rows are rewritten by one UPDATE and the
+    missing ones are created by `bulk_create`. Returns the fine ids.
+    """
+    fines = {
+        borrowing.id: fine_for(borrowing, return_date) for borrowing in overdue
+    }
+    existing = {
+        row["borrowing_id"]: row
+        for row in Payment.objects.filter(borrowing_id__in=fines).values(
+            "id", "borrowing_id", "status", "money_to_pay"
+        )
+    }
+
+    balances = defaultdict(lambda: [0, Decimal(0)])
+    for borrowing in overdue:
+        balance = balances[borrowing.user_id]
+        balance[0] += 1
+        balance[1] += fines[borrowing.id]
+        old = existing.get(borrowing.id)
+        if old and old["status"] == "PENDING":
+            balance[0] -= 1
+            balance[1] -= old["money_to_pay"]
+
+    if existing:
+        Payment.objects.filter(
+            id__in=[row["id"] for row in existing.values()]
+        ).update(
+            status="PENDING",
+            type="FINE",
+            money_to_pay=Case(
+                *(
+                    When(borrowing_id=pk, then=Value(fines[pk]))
+                    for pk in existing
+                ),
+                output_field=DecimalField(max_digits=5, decimal_places=2),
+            ),
+            session_url="",
+            session_id=None,
+            session_expires_at=None,
+        )
+    created = Payment.objects.bulk_create(
+        Payment(
+            status="PENDING",
+            type="FINE",
+            borrowing_id=borrowing_id,
+            money_to_pay=money_to_pay,
+        )
+        for borrowing_id, money_to_pay in fines.items()
+        if borrowing_id not in existing
+    )
+
+    # Bulk writes skip the payment signals
+    for user_id, (count, amount) in balances.items():
+        adjust_balance(user_id, count, amount)
+
+    return [row["id"] for row in existing.values()] + [
+        payment.id for payment in created
+    ]
+
+
+def return_borrowings(borrowing_ids, return_date) -> dict:
+    """
+    Return many loans in one transaction with a fixed number of queries:
+    copies go to holds or back on the shelf, summaries are updated per
+    group, and the Stripe sessions of the fines are prepared by workers
+    after commit.
+    """
+    with transaction.atomic():
+        borrowings = list(
+            Borrowing.objects.select_for_update(of=("self",))
+            .select_related("book")
+            .filter(id__in=borrowing_ids, actual_return_date__isnull=True)
+        )
+        returned = [borrowing.id for borrowing in borrowings]
+        Borrowing.objects.filter(id__in=returned).update(
+            actual_return_date=return_date
+        )
+        invalidate_summaries(borrowing.user_id for borrowing in borrowings)
+        return_copies(borrowing.book for borrowing in borrowings)
+        record_returns(borrowings)
+
+        overdue = [
+            borrowing
+            for borrowing in borrowings
+            if return_date > borrowing.expected_return_date
+        ]
+        fine_ids = _charge_fines(overdue, return_date) if overdue else []
+        schedule_payment_sessions(fine_ids)
+
+    return {
+        "returned": sorted(returned),
+        "skipped": sorted(set(borrowing_ids) - set(returned)),
+        "fines": len(fine_ids),
+    }
@@ -1,44 +1,22 @@
 import datetime
-import os
 
-import stripe
 from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from books.models import Book
+from books.cache import invalidate_books
+from books.inventory import available_copies, reserve_copy
 from books.serializers import BookSerializer
-from library_service import telegram_bot
-from borrowings.models import Borrowing
+from library_service.sparse_fields import SparseFieldsMixin
+from library_service.values_serializers import ValuesSerializer
+from borrowings.models import Borrowing, Hold
+from borrowings.summaries import record_borrowing
+from notifications.outbox import notify
 from payments.models import Payment
+from payments.tasks import schedule_payment_session
 from user.serializers import UserSerializer
 
 
-stripe.api_key = os.environ.get("API_KEY")
-
-
-def create_stripe_session(book: Book, price: float) -> tuple:
-    session = stripe.checkout.Session.create(
-        line_items=[
-            {
-                "price_data": {
-                    "currency": "usd",
-                    "product_data": {
-                        "name": book.title,
-                    },
-                    "unit_amount": int(price * 100),
-                },
-                "quantity": 1,
-            }
-        ],
-        mode="payment",
-        success_url=("http://localhost:8000/api/"
-                     "payments/success?session_id={CHECKOUT_SESSION_ID}"),
-        cancel_url="http://localhost:8000/api/payments/cancel",
-    )
-    return session.url, session.id
-
-
 class BorrowingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
@@ -58,40 +36,54 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
         data = super(BorrowingCreateSerializer, self).validate(attrs=attrs)
 
         book = data["book"]
+        ready_hold = Hold.objects.filter(
+            book=book,
+            user=self.context["request"].user,
+            status=Hold.Status.READY,
+        )
 
-        if book.inventory < 1:
+        if available_copies(book) < 1 and not ready_hold.exists():
             raise ValidationError("We don`t have this book now")
 
         return data
 
     def create(self, validated_data):
         with transaction.atomic():
-            book = validated_data.pop("book")
+            book = validated_data["book"]
 
-            book.inventory -= 1
-            book.save()
+            # A ready hold already has a copy set aside for this user
+            hold = (
+                Hold.objects.select_for_update()
+                .filter(book=book, user=validated_data["user"])
+                .first()
+            )
+            if hold is not None:
+                hold.delete()
+            if hold is not None and hold.status == Hold.Status.READY:
+                # No reserve_copy here to drop the cached book details
+                invalidate_books([book.pk])
+            elif not reserve_copy(book):
+                raise ValidationError("We don`t have this book now")
 
-            validated_data["book"] = book
-            telegram_bot.send_message(
+            borrowing = Borrowing.objects.create(**validated_data)
+            notify(
                 "New Borrowing:\n"
                 f"User: {validated_data['user']}\n"
-                f"Book: {validated_data['book']}\n"
+                f"Book: {validated_data['book']}\n",
+                key=f"borrowing:{borrowing.id}",
             )
-            borrowing = Borrowing.objects.create(**validated_data)
-            money_to_pay = book.daily_fee * Borrowing.MAX_TERM
-            session_url, session_id = create_stripe_session(book, money_to_pay)
-            Payment.objects.create(
+            record_borrowing(borrowing)
+            payment = Payment.objects.create(
                 status="PENDING",
                 borrowing=borrowing,
                 type="PAYMENT",
-                session_url=session_url,
-                session_id=session_id,
-                money_to_pay=money_to_pay,
+                money_to_pay=book.daily_fee * Borrowing.MAX_TERM,
             )
+            schedule_payment_session(payment)
             return borrowing
 
 
-class BorrowingListSerializer(serializers.ModelSerializer):
+class BorrowingListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     book_title = serializers.CharField(source="book.title", read_only=True)
     user_email = serializers.CharField(source="user.email", read_only=True)
     payment_url = serializers.URLField(source="payment.session_url")
@@ -109,7 +101,7 @@ class BorrowingListSerializer(serializers.ModelSerializer):
         )
 
 
-class BorrowingDetailSerializer(serializers.ModelSerializer):
+class BorrowingDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(many=False)
     book = BookSerializer(many=False)
     payment_url = serializers.URLField(source="payment.session_url")
@@ -147,3 +139,77 @@ class BorrowingReturnSerializer(serializers.ModelSerializer):
             raise ValidationError("Wrong date!")
 
         return super(BorrowingReturnSerializer, self).validate(attrs)
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=1000
+    )
+    actual_return_date = serializers.DateField()
+
+    def validate_actual_return_date(self, value):
+        if value < datetime.date.today():
+            raise ValidationError("Wrong date!")
+
+        return value
+
+
+class BorrowingHistorySerializer(serializers.Serializer):
+    """Reads the `values()` rows of `borrowings.archive.borrowing_history`"""
+
+    id = serializers.IntegerField()
+    borrow_date = serializers.DateField()
+    expected_return_date = serializers.DateField()
+    actual_return_date = serializers.DateField()
+    book = serializers.IntegerField(source="book_id")
+    book_title = serializers.CharField(source="book__title")
+    payment_status = serializers.CharField(source="payment__status")
+    payment_type = serializers.CharField(source="payment__type")
+    money_to_pay = serializers.DecimalField(
+        source="payment__money_to_pay", max_digits=5, decimal_places=2
+    )
+    archived = serializers.BooleanField()
+
+
+class BorrowingSummarySerializer(serializers.Serializer):
+    active_loans = serializers.IntegerField()
+    overdue_loans = serializers.IntegerField()
+    lifetime_loans = serializers.IntegerField()
+    pending_payments = serializers.IntegerField()
+    outstanding_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2
+    )
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    position = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Hold
+        fields = (
+            "id",
+            "book",
+            "book_title",
+            "status",
+            "position",
+            "created_at",
+            "ready_at",
+        )
+        read_only_fields = ("id", "status", "created_at", "ready_at")
+        # Uniqueness per user is checked in `validate`, `user` is not an input
+        validators = []
+
+    def validate(self, attrs):
+        book = attrs["book"]
+        user = self.context["request"].user
+
+        if available_copies(book) > 0:
+            raise ValidationError("This book is available, borrow it instead")
+        if Hold.objects.filter(book=book, user=user).exists():
+            raise ValidationError("You are already waiting for this book")
+
+        return attrs
+
+
+borrowing_list_values = ValuesSerializer(BorrowingListSerializer)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from borrowings.cache import invalidate_summaries
+from borrowings.models import Borrowing
+
+
+@receiver(post_save, sender=Borrowing)
+@receiver(post_delete, sender=Borrowing)
+def invalidate_summary_cache(sender, instance, **kwargs):
+    invalidate_summaries([instance.user_id])
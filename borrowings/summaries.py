@@ -0,0 +1,138 @@
+import datetime
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Case,
+    Count,
+    DateField,
+    DecimalField,
+    F,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from borrowings.models import ArchivedBorrowing, BookLoanSummary, Borrowing
+
+
+def _update_summary(book_id: int, **changes) -> None:
+    summaries = BookLoanSummary.objects.filter(book_id=book_id)
+    if not summaries.update(**changes):
+        BookLoanSummary.objects.get_or_create(book_id=book_id)
+        summaries.update(**changes)
+
+
+def record_borrowing(borrowing: Borrowing) -> None:
+    """Count a new loan in the book summary, call inside the checkout"""
+    due = borrowing.expected_return_date
+    _update_summary(
+        borrowing.book_id,
+        active_loans=F("active_loans") + 1,
+        total_loans=F("total_loans") + 1,
+        next_return_date=Case(
+            When(next_return_date__lte=due, then=F("next_return_date")),
+            default=Value(due),
+        ),
+    )
+
+
+def record_return(borrowing: Borrowing) -> None:
+    """Drop a returned loan from the book summary, call inside the return"""
+    next_return_date = Borrowing.objects.filter(
+        book_id=borrowing.book_id, actual_return_date__isnull=True
+    ).aggregate(next_return_date=Min("expected_return_date"))["next_return_date"]
+    _update_summary(
+        borrowing.book_id,
+        active_loans=Case(
+            When(active_loans__gt=0, then=F("active_loans") - 1),
+            default=Value(0),
+        ),
+        next_return_date=next_return_date,
+    )
+
+
+def record_returns(borrowings) -> None:
+    """
+    `record_return` for many loans at once: one UPDATE covers every book.
+    Call after the loans were marked as returned.
+    """
+    counts = Counter(borrowing.book_id for borrowing in borrowings)
+    if not counts:
+        return
+
+    next_return_dates = dict(
+        Borrowing.objects.filter(
+            book_id__in=counts, actual_return_date__isnull=True
+        )
+        .values("book_id")
+        .annotate(next_return_date=Min("expected_return_date"))
+        .values_list("book_id", "next_return_date")
+    )
+    BookLoanSummary.objects.bulk_create(
+        (BookLoanSummary(book_id=book_id) for book_id in counts),
+        ignore_conflicts=True,
+    )
+    BookLoanSummary.objects.filter(book_id__in=counts).update(
+        active_loans=Case(
+            *(
+                When(
+                    book_id=book_id,
+                    active_loans__gte=count,
+                    then=F("active_loans") - count,
+                )
+                for book_id, count in counts.items()
+            ),
+            default=Value(0),
+        ),
+        next_return_date=Case(
+            *(
+                When(book_id=book_id, then=Value(next_return_date))
+                for book_id, next_return_date in next_return_dates.items()
+            ),
+            default=None,
+            output_field=DateField(),
+        ),
+    )
+
+
+def user_summary(user_id: int) -> dict:
+    """Loan and payment counters of a user, read with a single query"""
+    today = datetime.date.today()
+    active = Q(borrowings__actual_return_date__isnull=True)
+    archived = (
+        ArchivedBorrowing.objects.filter(user=OuterRef("pk"))
+        .values("user")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .annotate(
+            active_loans=Count("borrowings", filter=active),
+            overdue_loans=Count(
+                "borrowings",
+                filter=active & Q(borrowings__expected_return_date__lt=today),
+            ),
+            lifetime_loans=Count("borrowings")
+            + Coalesce(Subquery(archived), 0),
+        )
+        .values(
+            "active_loans",
+            "overdue_loans",
+            "lifetime_loans",
+            pending_payments=Coalesce(F("outstanding_balance__pending_count"), 0),
+            outstanding_amount=Coalesce(
+                F("outstanding_balance__pending_amount"),
+                Value(Decimal(0)),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+        .get()
+    )
@@ -1,23 +1,130 @@
 import datetime
+from itertools import groupby
+from operator import itemgetter
 
 from celery import shared_task
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
 
-from library_service import telegram_bot
-from borrowings.models import Borrowing
+from books.models import Book
+from borrowings.archive import archive_returned
+from borrowings.holds import expire_ready_holds
+from borrowings.models import AccruedFine, Borrowing
+from borrowings.returns import FINE_MULTIPLIER
+from notifications.outbox import notify_many
+
+REMINDER_CHUNK_SIZE = 2000
+FINE_BATCH_SIZE = 2000
+# Longer digests list the first loans and count the rest
+DIGEST_MAX_LOANS = 20
+
+
+def overdue_digest(email: str, loans: list) -> str:
+    lines = [
+        f"- {title}, should be returned in {expected_return_date}"
+        for title, expected_return_date in loans[:DIGEST_MAX_LOANS]
+    ]
+    if len(loans) > DIGEST_MAX_LOANS:
+        lines.append(f"- ... and {len(loans) - DIGEST_MAX_LOANS} more")
+    return (
+        "Overdue borrowings:\n"
+        f"User {email} didn't return {len(loans)} book(s)\n"
+        + "\n".join(lines)
+    )
 
 
 @shared_task
 def outdated_borrowings():
-    borrowings = Borrowing.objects.filter(
-        expected_return_date__lt=datetime.datetime.today(), actual_return_date=None
+    """
+    Queue one digest per user with overdue loans. A single joined scan,
+    read in chunks and grouped by user, also yields the counts.
+    """
+    today = datetime.date.today()
+    rows = (
+        Borrowing.objects.filter(
+            expected_return_date__lt=today,
+            actual_return_date=None,
+        )
+        .order_by("user_id", "expected_return_date", "id")
+        .values_list("user_id", "user__email", "book__title", "expected_return_date")
+        .iterator(chunk_size=REMINDER_CHUNK_SIZE)
+    )
+
+    users = loans = 0
+    digests = []
+    with transaction.atomic():
+        for (user_id, email), user_rows in groupby(rows, key=itemgetter(0, 1)):
+            user_loans = [(title, due) for _, _, title, due in user_rows]
+            users += 1
+            loans += len(user_loans)
+            digests.append(
+                (f"overdue:{user_id}:{today}", overdue_digest(email, user_loans))
+            )
+            if len(digests) >= REMINDER_CHUNK_SIZE:
+                notify_many(digests)
+                digests = []
+        notify_many(digests)
+
+    return f"{loans} borrowings of {users} users are overdue"
+
+
+@shared_task
+def accrue_fines():
+    """
+    Keep `AccruedFine` in step with the overdue loans still out. Every step
+    is a set-based statement over the loans whose state changed since the
+    last run: newly overdue, returned or rescheduled, or repriced books.
+    """
+    overdue = Borrowing.objects.filter(
+        actual_return_date=None,
+        expected_return_date__lt=datetime.date.today(),
     )
+    fines = AccruedFine.objects.all()
+
+    with transaction.atomic():
+        cleared, _ = fines.exclude(borrowing__in=overdue).delete()
 
-    for borrowing in borrowings:
-        telegram_bot.send_message(
-            "New Borrowing:\n"
-            f"User {borrowing.user} didn't return the book\n"
-            f"Book: {borrowing.book}\n"
-            f"Should be returned in {borrowing.expected_return_date}"
+        book = Book.objects.filter(borrowings=OuterRef("borrowing"))
+        updated = fines.filter(
+            ~Q(overdue_since=F("borrowing__expected_return_date"))
+            | ~Q(daily_fine=F("borrowing__book__daily_fee") * FINE_MULTIPLIER)
+        ).update(
+            overdue_since=Subquery(
+                Borrowing.objects.filter(pk=OuterRef("borrowing")).values(
+                    "expected_return_date"
+                )
+            ),
+            daily_fine=Subquery(book.values("daily_fee")) * FINE_MULTIPLIER,
         )
 
-    return f"{borrowings.count()} users didn't return the book"
+        rows = (
+            overdue.filter(accrued_fine__isnull=True)
+            .values_list("id", "expected_return_date", "book__daily_fee")
+            .iterator(chunk_size=FINE_BATCH_SIZE)
+        )
+        created = 0
+        batch = []
+        for borrowing_id, due, daily_fee in rows:
+            batch.append(
+                AccruedFine(
+                    borrowing_id=borrowing_id,
+                    overdue_since=due,
+                    daily_fine=daily_fee * FINE_MULTIPLIER,
+                )
+            )
+            if len(batch) == FINE_BATCH_SIZE:
+                created += len(AccruedFine.objects.bulk_create(batch))
+                batch = []
+        created += len(AccruedFine.objects.bulk_create(batch))
+
+    return f"{created} fines accrued, {updated} updated, {cleared} cleared"
+
+
+@shared_task
+def archive_borrowings():
+    return f"Archived {archive_returned()} borrowings"
+
+
+@shared_task
+def expire_holds():
+    return f"{expire_ready_holds()} holds expired"
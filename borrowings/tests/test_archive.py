@@ -0,0 +1,120 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.tests.test_book_api import sample_book
+from borrowings.archive import archive_batch, archive_returned, claim_batch
+from borrowings.models import ArchivedBorrowing, Borrowing
+from borrowings.tests.test_borrowing_api import sample_borrowing
+from payments.models import ArchivedPayment, OutstandingBalance, Payment
+from payments.tests import sample_payment
+
+HISTORY_URL = reverse("borrowings:borrowing-history")
+LONG_AGO = datetime.date.today() - datetime.timedelta(days=200)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "reader@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book()
+
+    def borrow(self, payment_status="PAID", **params):
+        borrowing = sample_borrowing(user=self.user, book=self.book, **params)
+        sample_payment(
+            borrowing=borrowing,
+            status=payment_status,
+            session_id=f"cs_{borrowing.id}",
+        )
+        return borrowing
+
+    def test_moves_old_settled_loans_with_payments(self):
+        old = self.borrow(actual_return_date=LONG_AGO)
+        unpaid = self.borrow(
+            payment_status="PENDING", actual_return_date=LONG_AGO
+        )
+        recent = self.borrow(actual_return_date=datetime.date.today())
+        active = self.borrow()
+
+        self.assertEqual(archive_returned(), 1)
+
+        self.assertEqual(
+            set(Borrowing.objects.values_list("id", flat=True)),
+            {unpaid.id, recent.id, active.id},
+        )
+        archived = ArchivedBorrowing.objects.get()
+        self.assertEqual(archived.id, old.id)
+        self.assertEqual(archived.actual_return_date, LONG_AGO)
+        self.assertEqual(ArchivedPayment.objects.get().borrowing, archived)
+        self.assertFalse(Payment.objects.filter(borrowing_id=old.id).exists())
+        self.assertEqual(
+            OutstandingBalance.objects.get(user=self.user).pending_count, 1
+        )
+
+    def test_batches_resume_where_they_stopped(self):
+        for _ in range(5):
+            self.borrow(actual_return_date=LONG_AGO)
+
+        self.assertEqual(archive_returned(batch_size=2, max_batches=1), 2)
+        self.assertEqual(Borrowing.objects.count(), 3)
+
+        call_command("archive_borrowings", "--batch-size=2", stdout=StringIO())
+
+        self.assertFalse(Borrowing.objects.exists())
+        self.assertEqual(ArchivedBorrowing.objects.count(), 5)
+
+    def test_claim_locks_only_borrowing_rows(self):
+        features = connection.features
+        with mock.patch.multiple(
+            features,
+            has_select_for_update=True,
+            has_select_for_update_skip_locked=True,
+            has_select_for_update_of=True,
+        ), transaction.atomic():
+            sql = str(claim_batch().query)
+
+        self.assertIn(
+            'FOR UPDATE OF "borrowings_borrowing" SKIP LOCKED', sql
+        )
+        self.assertIn("LEFT OUTER JOIN", sql)
+
+    def test_batch_queries_do_not_grow_with_size(self):
+        def count_queries(loans):
+            for _ in range(loans):
+                self.borrow(actual_return_date=LONG_AGO)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(archive_batch(), loans)
+            return len(queries)
+
+        self.assertEqual(count_queries(1), count_queries(10))
+
+    def test_history_covers_hot_and_archived_loans(self):
+        old = self.borrow(actual_return_date=LONG_AGO)
+        active = self.borrow()
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        sample_borrowing(user=other, book=self.book)
+        Borrowing.objects.filter(id=old.id).update(borrow_date=LONG_AGO)
+        archive_returned()
+
+        res = self.client.get(HISTORY_URL)
+
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual(
+            [(row["id"], row["archived"]) for row in res.data["results"]],
+            [(active.id, False), (old.id, True)],
+        )
+        self.assertEqual(
+            res.data["results"][1]["actual_return_date"], str(LONG_AGO)
+        )
+        self.assertEqual(res.data["results"][1]["payment_status"], "PAID")
@@ -1,13 +1,24 @@
+import datetime
+import json
+from unittest import mock
+
 from django.test import TestCase
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from books.inventory import enable_sharding
 from books.tests.test_book_api import sample_book
 from borrowings.models import Borrowing
 from borrowings.serializers import BorrowingListSerializer
+from borrowings.views import BorrowingViewSet
+from payments.models import Payment
 
 BORROWING_URL = reverse("borrowings:borrowing-list")
 
@@ -21,9 +32,26 @@ def sample_borrowing(**params):
     return Borrowing.objects.create(**defaults)
 
 
+def mock_checkout_services(test_case):
+    """Stub Telegram and Stripe calls made during checkout and return"""
+    session = (
+        "https://checkout.stripe.com/test",
+        "cs_test",
+        timezone.now() + datetime.timedelta(hours=24),
+    )
+    for target, kwargs in (
+        ("library_service.telegram_bot.send_message", {}),
+        ("payments.sessions.create_stripe_session", {"return_value": session}),
+    ):
+        patcher = mock.patch(target, **kwargs)
+        test_case.addCleanup(patcher.stop)
+        mocked = patcher.start()
+        setattr(test_case, target.rsplit(".", 1)[-1], mocked)
+
+
 def book_return_url(borrowing_id):
     """Return URL for book return"""
-    return reverse("borrowings:return_book", args=[borrowing_id])
+    return reverse("borrowings:borrowing-return-book", args=[borrowing_id])
 
 
 class UnauthenticatedBorrowingApiTests(TestCase):
@@ -56,8 +84,8 @@ class AuthenticatedBorrowingApiTests(TestCase):
         serializer1 = BorrowingListSerializer(borrowing1)
         serializer2 = BorrowingListSerializer(borrowing2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_filter_borrowing_by_user_do_nothing_if_not_staff(self):
         book1 = sample_book()
@@ -74,8 +102,221 @@ class AuthenticatedBorrowingApiTests(TestCase):
         serializer2 = BorrowingListSerializer(borrowing2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
+
+    def test_export_only_own_borrowings(self):
+        book = sample_book()
+        user2 = get_user_model().objects.create_user(
+            "test2@test2.com",
+            "testpass234"
+        )
+        borrowing = sample_borrowing(book=book, user=self.user)
+        sample_borrowing(book=book, user=user2)
+
+        res = self.client.get(reverse("borrowings:borrowing-export"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [
+            json.loads(line)
+            for line in b"".join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], borrowing.id)
+        self.assertEqual(rows[0]["book_title"], book.title)
+        self.assertEqual(rows[0]["user_email"], self.user.email)
+
+    def test_create_borrowing_reserves_copy(self):
+        mock_checkout_services(self)
+        book = sample_book(inventory=1)
+
+        res = self.client.post(BORROWING_URL, {"book": book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+
+    def test_checkout_defers_stripe_session(self):
+        mock_checkout_services(self)
+        book = sample_book()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(BORROWING_URL, {"book": book.id})
+
+        payment = Payment.objects.get(borrowing_id=res.data["id"])
+        self.assertEqual(payment.session_url, "")
+        self.create_stripe_session.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.session_id, "cs_test")
+        self.create_stripe_session.assert_called_once()
+
+    def test_detail_replaces_expired_session(self):
+        mock_checkout_services(self)
+        borrowing = sample_borrowing(book=sample_book(), user=self.user)
+        Payment.objects.create(
+            status="PENDING",
+            type="PAYMENT",
+            borrowing=borrowing,
+            session_url="https://checkout.stripe.com/old",
+            session_id="cs_old",
+            session_expires_at=timezone.now() - datetime.timedelta(minutes=1),
+            money_to_pay=10,
+        )
+
+        res = self.client.get(
+            reverse("borrowings:borrowing-detail", args=[borrowing.id])
+        )
+
+        self.assertEqual(res.data["payment_id"], "cs_test")
+        self.assertEqual(res.data["payment_url"], "https://checkout.stripe.com/test")
+
+        self.client.get(reverse("borrowings:borrowing-detail", args=[borrowing.id]))
+        self.create_stripe_session.assert_called_once()
+
+    def test_detail_of_sharded_book_is_one_query(self):
+        book = sample_book(inventory=6)
+        enable_sharding(book, shard_count=3)
+        borrowing = sample_borrowing(book=book, user=self.user)
+        Payment.objects.create(
+            status="PENDING",
+            type="PAYMENT",
+            borrowing=borrowing,
+            session_url="https://checkout.stripe.com/test",
+            session_id="cs_test",
+            session_expires_at=timezone.now() + datetime.timedelta(hours=1),
+            money_to_pay=10,
+        )
+        url = reverse("borrowings:borrowing-detail", args=[borrowing.id])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+
+        self.assertEqual(res.data["book"]["available"], 6)
+        self.assertEqual(res.data["payment_id"], "cs_test")
+
+    def test_sparse_detail_joins_nothing(self):
+        borrowing = sample_borrowing(book=sample_book(), user=self.user)
+        Payment.objects.create(
+            status="PENDING",
+            type="PAYMENT",
+            borrowing=borrowing,
+            session_url="https://checkout.stripe.com/test",
+            session_id="cs_test",
+            money_to_pay=10,
+        )
+        url = reverse("borrowings:borrowing-detail", args=[borrowing.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {"fields": "id"})
+
+        self.assertEqual(list(res.data), ["id"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("JOIN", queries[0]["sql"])
+
+    def test_create_borrowing_without_stock(self):
+        mock_checkout_services(self)
+        book = sample_book(inventory=0)
+
+        res = self.client.post(BORROWING_URL, {"book": book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_borrow_and_return_update_book_summary(self):
+        mock_checkout_services(self)
+        book = sample_book(inventory=1)
+        book_url = reverse("books:book-detail", args=[book.id])
+
+        res = self.client.post(BORROWING_URL, {"book": book.id})
+        borrowing = Borrowing.objects.get(id=res.data["id"])
+
+        res = self.client.get(book_url)
+        self.assertEqual(res.data["available"], 0)
+        self.assertEqual(res.data["on_loan"], 1)
+        self.assertEqual(
+            res.data["next_available_date"], borrowing.expected_return_date
+        )
+
+        res = self.client.put(
+            book_return_url(borrowing.id),
+            {"actual_return_date": datetime.date.today()},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(book_url)
+        self.assertEqual(res.data["available"], 1)
+        self.assertEqual(res.data["on_loan"], 0)
+        self.assertEqual(res.data["next_available_date"], datetime.date.today())
+        self.assertEqual(book.loan_summary.total_loans, 1)
+
+    def test_racing_returns_put_back_one_copy(self):
+        mock_checkout_services(self)
+        book = sample_book(inventory=1)
+        self.client.post(BORROWING_URL, {"book": book.id})
+        # Read by the second request before the first one returned the loan
+        stale = Borrowing.objects.get(book=book)
+
+        self.client.put(
+            book_return_url(stale.id), {"actual_return_date": datetime.date.today()}
+        )
+        with mock.patch.object(BorrowingViewSet, "get_object", return_value=stale):
+            res = self.client.put(
+                book_return_url(stale.id),
+                {"actual_return_date": datetime.date.today()},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 1)
+
+    def test_list_matches_model_serializer_byte_for_byte(self):
+        book = sample_book()
+        returned = sample_borrowing(book=book, user=self.user)
+        returned.actual_return_date = datetime.date(2022, 12, 2)
+        returned.save()
+        paid = sample_borrowing(book=book, user=self.user)
+        Payment.objects.create(
+            status="PAID",
+            type="PAYMENT",
+            borrowing=paid,
+            session_url="https://checkout.stripe.com/pay/test",
+            session_id="cs_test",
+            money_to_pay=10,
+        )
+
+        res = self.client.get(BORROWING_URL)
+
+        expected = BorrowingListSerializer(
+            Borrowing.objects.order_by("-borrow_date", "-id"), many=True
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(res.data["results"]),
+            JSONRenderer().render(expected),
+        )
+
+    def test_sparse_fields_prune_json_and_joins(self):
+        sample_borrowing(book=sample_book(), user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(BORROWING_URL, {"fields": "id,book_title"})
+
+        self.assertEqual(list(res.data["results"][0]), ["id", "book_title"])
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn('"books_book"', sql)
+        self.assertNotIn('JOIN "payments_payment"', sql)
+
+    def test_omit_fields(self):
+        sample_borrowing(book=sample_book(), user=self.user)
+
+        res = self.client.get(BORROWING_URL, {"omit": "user_email,payment_url"})
+
+        self.assertNotIn("user_email", res.data["results"][0])
+        self.assertNotIn("payment_url", res.data["results"][0])
+        self.assertIn("book_title", res.data["results"][0])
 
     def test_borrowing_str(self):
         book = sample_book()
@@ -114,5 +355,5 @@ class AdminBorrowingApiTests(TestCase):
         serializer1 = BorrowingListSerializer(borrowing1)
         serializer2 = BorrowingListSerializer(borrowing2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
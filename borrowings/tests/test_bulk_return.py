@@ -0,0 +1,122 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.inventory import available_copies, enable_sharding
+from books.tests.test_book_api import sample_book
+from borrowings.models import BookLoanSummary, Borrowing
+from borrowings.tests.test_borrowing_api import (
+    mock_checkout_services,
+    sample_borrowing,
+)
+from payments.models import OutstandingBalance, Payment
+from payments.tests import sample_payment
+
+RETURN_BOOKS_URL = reverse("borrowings:borrowing-return-books")
+TODAY = datetime.date.today()
+
+
+class BulkReturnTests(TestCase):
+    def setUp(self):
+        mock_checkout_services(self)
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "staff@test.com", "testpass", is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            "reader@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.admin)
+        self.book = sample_book(inventory=0, daily_fee=Decimal("1.50"))
+
+    def return_books(self, ids, return_date=TODAY):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                RETURN_BOOKS_URL,
+                {"borrowings": ids, "actual_return_date": return_date},
+                format="json",
+            )
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.return_books([1])
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_past_date_rejected(self):
+        res = self.return_books([1], TODAY - datetime.timedelta(days=1))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_returns_restock_books_and_update_summaries(self):
+        sharded = sample_book(title="Sharded", inventory=0)
+        enable_sharding(sharded, shard_count=2)
+        ids = [
+            sample_borrowing(user=self.user, book=book).id
+            for book in (self.book, self.book, sharded)
+        ]
+        BookLoanSummary.objects.create(book=self.book, active_loans=2)
+        returned = sample_borrowing(
+            user=self.user, book=self.book, actual_return_date=TODAY
+        )
+
+        res = self.return_books(ids + [returned.id, 999])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {"returned": ids, "skipped": [returned.id, 999], "fines": 0}
+        )
+        self.assertFalse(
+            Borrowing.objects.filter(id__in=ids, actual_return_date=None).exists()
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+        sharded.refresh_from_db()
+        self.assertEqual(available_copies(sharded), 1)
+        summary = BookLoanSummary.objects.get(book=self.book)
+        self.assertEqual(summary.active_loans, 0)
+        self.assertIsNone(summary.next_return_date)
+        self.assertEqual(BookLoanSummary.objects.get(book=sharded).active_loans, 0)
+
+    def test_overdue_loans_are_fined(self):
+        due = TODAY - datetime.timedelta(days=3)
+        with_payment = sample_borrowing(
+            user=self.user, book=self.book, expected_return_date=due
+        )
+        sample_payment(borrowing=with_payment, money_to_pay=21)
+        without_payment = sample_borrowing(
+            user=self.user, book=self.book, expected_return_date=due
+        )
+        on_time = sample_borrowing(user=self.user, book=self.book)
+        session = self.create_stripe_session.return_value
+        self.create_stripe_session.side_effect = [
+            (session[0], f"cs_fine_{index}", session[2]) for index in range(2)
+        ]
+
+        res = self.return_books(
+            [with_payment.id, without_payment.id, on_time.id]
+        )
+
+        self.assertEqual(res.data["fines"], 2)
+        fines = Payment.objects.filter(type="FINE", status="PENDING")
+        self.assertEqual(
+            sorted(fines.values_list("borrowing_id", "money_to_pay")),
+            [
+                (with_payment.id, Decimal("9.00")),
+                (without_payment.id, Decimal("9.00")),
+            ],
+        )
+        balance = OutstandingBalance.objects.get(user=self.user)
+        self.assertEqual(balance.pending_count, 2)
+        self.assertEqual(balance.pending_amount, Decimal("18.00"))
+        self.assertEqual(self.create_stripe_session.call_count, 2)
+        self.assertEqual(
+            sorted(fines.values_list("session_id", flat=True)),
+            ["cs_fine_0", "cs_fine_1"],
+        )
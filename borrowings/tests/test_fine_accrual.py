@@ -0,0 +1,66 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import AccruedFine
+from borrowings.tasks import accrue_fines
+from borrowings.tests.test_borrowing_api import sample_borrowing
+
+TODAY = datetime.date.today()
+
+
+def days_ago(days: int) -> datetime.date:
+    return TODAY - datetime.timedelta(days=days)
+
+
+class FineAccrualTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "late@test.com", "testpass"
+        )
+        self.book = sample_book(daily_fee=Decimal("1.25"))
+
+    def borrow(self, **params):
+        return sample_borrowing(user=self.user, book=self.book, **params)
+
+    def test_accrues_overdue_active_loans(self):
+        overdue = self.borrow(expected_return_date=days_ago(4))
+        self.borrow(expected_return_date=days_ago(4), actual_return_date=TODAY)
+        self.borrow(expected_return_date=TODAY)
+
+        self.assertEqual(
+            accrue_fines(), "1 fines accrued, 0 updated, 0 cleared"
+        )
+
+        fine = AccruedFine.objects.get()
+        self.assertEqual(fine.borrowing, overdue)
+        self.assertEqual(fine.daily_fine, Decimal("2.50"))
+        self.assertEqual(fine.amount, Decimal("10.00"))
+
+    def test_rerun_only_touches_changed_loans(self):
+        returned = self.borrow(expected_return_date=days_ago(4))
+        extended = self.borrow(expected_return_date=days_ago(2))
+        self.borrow(expected_return_date=days_ago(1))
+        accrue_fines()
+
+        returned.actual_return_date = TODAY
+        returned.save()
+        extended.expected_return_date = days_ago(1)
+        extended.save()
+        self.book.daily_fee = Decimal("2.00")
+        self.book.save()
+        self.borrow(expected_return_date=days_ago(3))
+
+        self.assertEqual(
+            accrue_fines(), "1 fines accrued, 2 updated, 1 cleared"
+        )
+        self.assertEqual(
+            accrue_fines(), "0 fines accrued, 0 updated, 0 cleared"
+        )
+        self.assertFalse(AccruedFine.objects.filter(borrowing=returned).exists())
+        fine = AccruedFine.objects.get(borrowing=extended)
+        self.assertEqual(fine.overdue_since, days_ago(1))
+        self.assertEqual(fine.amount, Decimal("4.00"))
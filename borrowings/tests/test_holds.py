@@ -0,0 +1,181 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.tests.test_book_api import sample_book
+from borrowings.holds import HOLD_PICKUP_DAYS, cancel_hold, expire_ready_holds
+from borrowings.models import Borrowing, Hold
+from borrowings.summaries import record_borrowing
+from borrowings.tests.test_borrowing_api import (
+    BORROWING_URL,
+    book_return_url,
+    mock_checkout_services,
+    sample_borrowing,
+)
+from notifications.models import OutboxMessage
+
+HOLD_URL = reverse("borrowings:hold-list")
+TODAY = datetime.date.today()
+
+
+def hold_detail_url(hold_id):
+    return reverse("borrowings:hold-detail", args=[hold_id])
+
+
+class HoldTests(TestCase):
+    def setUp(self):
+        mock_checkout_services(self)
+        self.client = APIClient()
+        self.reader = get_user_model().objects.create_user(
+            "reader@test.com", "testpass"
+        )
+        self.first = get_user_model().objects.create_user(
+            "first@test.com", "testpass"
+        )
+        self.second = get_user_model().objects.create_user(
+            "second@test.com", "testpass"
+        )
+        self.book = sample_book(inventory=0)
+        self.loan = sample_borrowing(user=self.reader, book=self.book)
+
+    def place_hold(self, user, book=None):
+        self.client.force_authenticate(user)
+        return self.client.post(HOLD_URL, {"book": (book or self.book).id})
+
+    def return_loan(self):
+        self.client.force_authenticate(self.reader)
+        return self.client.put(
+            book_return_url(self.loan.id), {"actual_return_date": TODAY}
+        )
+
+    def test_hold_only_on_unavailable_book_once(self):
+        res = self.place_hold(self.first, sample_book(title="On shelf"))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.place_hold(self.first)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["position"], 1)
+
+        res = self.place_hold(self.first)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queue_positions(self):
+        self.place_hold(self.first)
+        res = self.place_hold(self.second)
+        self.assertEqual(res.data["position"], 2)
+
+        res = self.client.get(HOLD_URL)
+
+        self.assertEqual(res.data["results"][0]["position"], 2)
+
+    def test_return_goes_to_head_of_queue(self):
+        self.place_hold(self.first)
+        self.place_hold(self.second)
+
+        self.return_loan()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+        head = Hold.objects.get(user=self.first)
+        self.assertEqual(head.status, Hold.Status.READY)
+        self.assertEqual(
+            Hold.objects.get(user=self.second).status, Hold.Status.WAITING
+        )
+        self.assertIn("first@test.com", OutboxMessage.objects.last().text)
+
+        res = self.client.post(BORROWING_URL, {"book": self.book.id})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.first)
+        res = self.client.post(BORROWING_URL, {"book": self.book.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Hold.objects.filter(user=self.first).exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_hold_handover_refreshes_cached_book(self):
+        record_borrowing(self.loan)
+        book_url = reverse("books:book-detail", args=[self.book.id])
+        self.place_hold(self.first)
+        self.assertEqual(self.client.get(book_url).data["on_loan"], 1)
+
+        self.return_loan()
+        self.assertEqual(self.client.get(book_url).data["on_loan"], 0)
+
+        self.client.force_authenticate(self.first)
+        self.client.post(BORROWING_URL, {"book": self.book.id})
+        self.assertEqual(self.client.get(book_url).data["on_loan"], 1)
+
+    def test_return_without_holds_restocks(self):
+        self.return_loan()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_cancel_ready_hold_passes_copy_on(self):
+        self.place_hold(self.first)
+        self.place_hold(self.second)
+        self.return_loan()
+        head = Hold.objects.get(user=self.first)
+
+        self.client.force_authenticate(self.first)
+        res = self.client.delete(hold_detail_url(head.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            Hold.objects.get(user=self.second).status, Hold.Status.READY
+        )
+
+    def test_cancel_rereads_hold_made_ready_meanwhile(self):
+        self.place_hold(self.first)
+        stale = Hold.objects.get(user=self.first)
+        self.return_loan()
+
+        cancel_hold(stale)
+
+        self.assertFalse(Hold.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_expired_ready_hold_returns_copy_to_shelf(self):
+        self.place_hold(self.first)
+        self.return_loan()
+        Hold.objects.update(
+            ready_at=timezone.now()
+            - datetime.timedelta(days=HOLD_PICKUP_DAYS, hours=1)
+        )
+
+        self.assertEqual(expire_ready_holds(), 1)
+
+        self.assertFalse(Hold.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_bulk_return_allocates_holds(self):
+        other_loan = sample_borrowing(user=self.reader, book=self.book)
+        self.place_hold(self.first)
+        admin = get_user_model().objects.create_user(
+            "staff@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+
+        self.client.post(
+            reverse("borrowings:borrowing-return-books"),
+            {
+                "borrowings": [self.loan.id, other_loan.id],
+                "actual_return_date": TODAY,
+            },
+            format="json",
+        )
+
+        self.assertEqual(Hold.objects.get().status, Hold.Status.READY)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+        self.assertFalse(
+            Borrowing.objects.filter(actual_return_date=None).exists()
+        )
@@ -0,0 +1,72 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from books.tests.test_book_api import sample_book
+from borrowings.tasks import DIGEST_MAX_LOANS, outdated_borrowings
+from borrowings.tests.test_borrowing_api import sample_borrowing
+from notifications.models import OutboxMessage
+
+YESTERDAY = datetime.date.today() - datetime.timedelta(days=1)
+TOMORROW = datetime.date.today() + datetime.timedelta(days=1)
+
+
+class OverdueRemindersTests(TestCase):
+    def setUp(self):
+        self.book = sample_book(title="Late book")
+        self.user = get_user_model().objects.create_user(
+            "late@test.com", "testpass"
+        )
+
+    def borrow(self, count, user=None, **params):
+        params.setdefault("expected_return_date", YESTERDAY)
+        for _ in range(count):
+            sample_borrowing(user=user or self.user, book=self.book, **params)
+
+    def run_task(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = outdated_borrowings()
+        return result, len(queries)
+
+    def test_one_digest_per_user(self):
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        self.borrow(2)
+        self.borrow(1, user=other)
+        self.borrow(1, actual_return_date=YESTERDAY)
+        self.borrow(1, expected_return_date=TOMORROW)
+
+        result, _ = self.run_task()
+
+        self.assertEqual(result, "3 borrowings of 2 users are overdue")
+        texts = sorted(OutboxMessage.objects.values_list("text", flat=True))
+        self.assertEqual(len(texts), 2)
+        self.assertIn("User late@test.com didn't return 2 book(s)", texts[0])
+        self.assertEqual(texts[0].count("- Late book"), 2)
+        self.assertIn("User other@test.com didn't return 1 book(s)", texts[1])
+
+    def test_long_digest_is_truncated(self):
+        self.borrow(DIGEST_MAX_LOANS + 3)
+
+        self.run_task()
+
+        text = OutboxMessage.objects.get().text
+        self.assertEqual(text.count("- Late book"), DIGEST_MAX_LOANS)
+        self.assertIn("- ... and 3 more", text)
+
+    def test_queries_do_not_grow_with_loans(self):
+        self.borrow(3)
+        _, few = self.run_task()
+        OutboxMessage.objects.all().delete()
+
+        for index in range(10):
+            user = get_user_model().objects.create_user(
+                f"late{index}@test.com", "testpass"
+            )
+            self.borrow(3, user=user)
+        _, many = self.run_task()
+
+        self.assertEqual(few, many)
+        self.assertEqual(OutboxMessage.objects.count(), 11)
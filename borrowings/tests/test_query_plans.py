@@ -0,0 +1,52 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import Borrowing
+from borrowings.tests.test_borrowing_api import sample_borrowing
+
+
+def explain(queryset) -> str:
+    """
+    Query plan of `queryset`. PostgreSQL is told to avoid sequential scans,
+    which it would otherwise prefer on the tiny test tables.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+class IndexScanMixin:
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = explain(queryset)
+        self.assertNotRegex(plan, r"\bSCAN\b|Seq Scan", plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+
+class BorrowingQueryPlanTests(IndexScanMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "plan@test.com", "testpass"
+        )
+        sample_borrowing(user=self.user, book=sample_book())
+
+    def test_active_loans_of_user(self):
+        self.assertIndexScan(
+            Borrowing.objects.filter(user=self.user, actual_return_date=None),
+            "borrowing_active_user_idx",
+        )
+
+    def test_overdue_loans(self):
+        self.assertIndexScan(
+            Borrowing.objects.filter(
+                expected_return_date__lt=datetime.date.today(),
+                actual_return_date=None,
+            ),
+            "borrowing_active_due_idx",
+        )
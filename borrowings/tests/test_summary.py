@@ -0,0 +1,97 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import ArchivedBorrowing
+from borrowings.tests.test_borrowing_api import (
+    BORROWING_URL,
+    book_return_url,
+    mock_checkout_services,
+    sample_borrowing,
+)
+from payments.models import Payment
+from payments.tests import sample_payment
+
+SUMMARY_URL = reverse("borrowings:borrowing-summary")
+TODAY = datetime.date.today()
+
+
+class BorrowingSummaryTests(TestCase):
+    def setUp(self):
+        mock_checkout_services(self)
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "reader@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book(inventory=5)
+
+    def test_summary_counts(self):
+        overdue = sample_borrowing(
+            user=self.user,
+            book=self.book,
+            expected_return_date=TODAY - datetime.timedelta(days=2),
+        )
+        sample_payment(borrowing=overdue, money_to_pay="12.50")
+        sample_borrowing(user=self.user, book=self.book)
+        sample_borrowing(user=self.user, book=self.book, actual_return_date=TODAY)
+        ArchivedBorrowing.objects.create(
+            id=1000,
+            borrow_date=TODAY,
+            expected_return_date=TODAY,
+            actual_return_date=TODAY,
+            user=self.user,
+            book=self.book,
+        )
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        sample_borrowing(user=other, book=self.book)
+
+        res = self.client.get(SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                "active_loans": 2,
+                "overdue_loans": 1,
+                "lifetime_loans": 4,
+                "pending_payments": 1,
+                "outstanding_amount": "12.50",
+            },
+        )
+
+    def test_summary_is_cached(self):
+        self.client.get(SUMMARY_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(SUMMARY_URL)
+
+        self.assertEqual(res.data["lifetime_loans"], 0)
+
+    def test_borrow_return_and_payment_invalidate(self):
+        self.client.get(SUMMARY_URL)
+
+        res = self.client.post(BORROWING_URL, {"book": self.book.id})
+        borrowing_id = res.data["id"]
+        summary = self.client.get(SUMMARY_URL).data
+        self.assertEqual(summary["active_loans"], 1)
+        self.assertEqual(summary["pending_payments"], 1)
+
+        payment = Payment.objects.get(borrowing_id=borrowing_id)
+        payment.status = "PAID"
+        payment.save()
+        self.assertEqual(self.client.get(SUMMARY_URL).data["pending_payments"], 0)
+
+        self.client.put(
+            book_return_url(borrowing_id), {"actual_return_date": TODAY}
+        )
+        summary = self.client.get(SUMMARY_URL).data
+        self.assertEqual(summary["active_loans"], 0)
+        self.assertEqual(summary["lifetime_loans"], 1)
@@ -1,9 +1,11 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from borrowings.views import BorrowingViewSet
+from borrowings.views import BorrowingViewSet, HoldViewSet
 
 router = routers.DefaultRouter()
+# Before the borrowings, whose detail route would otherwise match "holds/"
+router.register("holds", HoldViewSet, basename="hold")
 router.register("", BorrowingViewSet, basename="borrowing")
 
 
@@ -8,30 +8,84 @@ from drf_spectacular.utils import (
 from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Hold
 from borrowings.serializers import (
     BorrowingListSerializer,
     BorrowingDetailSerializer,
     BorrowingCreateSerializer,
     BorrowingReturnSerializer,
-    create_stripe_session,
+    BorrowingBulkReturnSerializer,
+    BorrowingHistorySerializer,
+    BorrowingSummarySerializer,
+    HoldSerializer,
+    borrowing_list_values,
 )
+from books.inventory import attach_book_inventory, with_book_inventory
+from borrowings.archive import borrowing_history
+from borrowings.cache import (
+    SUMMARY_CACHE_TIMEOUT,
+    invalidate_summaries,
+    summary_key,
+)
+from borrowings.holds import cancel_hold, queue_position, return_copies
+from borrowings.returns import FINE_MULTIPLIER, return_borrowings
+from borrowings.summaries import record_return, user_summary
+from library_service.cache import get_or_compute
+from library_service.exports import stream_export
+from library_service.pagination import (
+    BorrowDateCursorPagination,
+    IdCursorPagination,
+    UnionLimitOffsetPagination,
+)
+from library_service.sparse_fields import sparse_related
+from library_service.values_serializers import ValuesListMixin
+from payments.balances import has_pending_payments
 from payments.models import Payment
+from payments.sessions import try_ensure_session
+from payments.tasks import schedule_payment_session
 
 
 class BorrowingViewSet(
+    ValuesListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     permission_classes = (IsAuthenticated,)
+    pagination_class = BorrowDateCursorPagination
+    values_serializer = borrowing_list_values
+    sparse_relations = {
+        "list": {
+            "book_title": ("book",),
+            "user_email": ("user",),
+            "payment_url": ("payment",),
+        },
+        "retrieve": {
+            "user": ("user",),
+            "book": ("book", "book__loan_summary"),
+            "payment_status": ("payment",),
+            "payment_url": ("payment",),
+            "payment_id": ("payment",),
+            "money_to_pay": ("payment",),
+        },
+    }
 
     def get_queryset(self):
-        queryset = Borrowing.objects.select_related("book", "user")
+        relations = self.sparse_relations.get(self.action)
+        if relations is None:
+            queryset = Borrowing.objects.select_related("book", "user")
+        else:
+            related = sparse_related(self.request, relations)
+            queryset = Borrowing.objects.all()
+            if related:
+                # A bare select_related() would join every non-null FK
+                queryset = queryset.select_related(*related)
+            if self.action == "retrieve" and "book" in related:
+                queryset = with_book_inventory(queryset, "book")
 
         is_active = self.request.query_params.get("is_active")
         user_id = self.request.query_params.get("user_id")
@@ -60,13 +114,34 @@ class BorrowingViewSet(
         if self.action == "return_book":
             return BorrowingReturnSerializer
 
+        if self.action == "return_books":
+            return BorrowingBulkReturnSerializer
+
+        if self.action == "history":
+            return BorrowingHistorySerializer
+
+        if self.action == "summary":
+            return BorrowingSummarySerializer
+
     def perform_create(self, serializer):
-        payments = Payment.objects.filter(borrowing__user_id=self.request.user)
-        for payment in payments:
-            if payment.status == "PENDING":
-                raise ValidationError("Please at first paid your previous borrowings")
+        if has_pending_payments(self.request.user):
+            raise ValidationError("Please at first paid your previous borrowings")
         serializer.save(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        borrowing = self.get_object()
+        attach_book_inventory(borrowing, "book")
+        # Left out by `?fields=` when no payment field is requested
+        payment = (
+            getattr(borrowing, "payment", None)
+            if Borrowing.payment.is_cached(borrowing)
+            else None
+        )
+        if payment is not None:
+            try_ensure_session(payment)
+        serializer = self.get_serializer(borrowing)
+        return Response(serializer.data)
+
     @transaction.atomic
     @action(methods=["PUT"], url_path="return_book", detail=True)
     def return_book(self, request, pk=None):
@@ -74,42 +149,114 @@ class BorrowingViewSet(
         serializer = self.get_serializer(borrowing, data=self.request.data)
         book = borrowing.book
         if serializer.is_valid():
-            if borrowing.actual_return_date is None:
-                book.inventory += 1
-                book.save()
-                serializer.save()
+            # Tie the copy to the loan's state change, so concurrent returns
+            # of the same loan put back a single copy
+            return_date = serializer.validated_data["actual_return_date"]
+            returned = Borrowing.objects.filter(
+                pk=borrowing.pk, actual_return_date__isnull=True
+            ).update(actual_return_date=return_date)
+            if returned == 1:
+                # The UPDATE skips the post_save cache invalidation
+                borrowing.actual_return_date = return_date
+                invalidate_summaries([borrowing.user_id])
+                return_copies([book])
+                record_return(borrowing)
                 if (
                         borrowing.actual_return_date
                         > borrowing.expected_return_date
                 ):
                     Payment.objects.get(borrowing=borrowing).delete()
-                    fine_multiplier = 2
                     days_of_overdue = (
                             borrowing.actual_return_date
                             - borrowing.expected_return_date
                     ).days
                     money_to_pay = (
-                            book.daily_fee * days_of_overdue * fine_multiplier
+                            book.daily_fee * days_of_overdue * FINE_MULTIPLIER
                     )
-                    session_url, session_id = create_stripe_session(
-                        book, money_to_pay
-                    )
-                    Payment.objects.create(
+                    fine = Payment.objects.create(
                         status="PENDING",
                         borrowing=borrowing,
                         type="FINE",
-                        session_url=session_url,
-                        session_id=session_id,
                         money_to_pay=money_to_pay,
                     )
+                    schedule_payment_session(fine)
                     serializer.save()
 
                 return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=["POST"],
+        url_path="return_books",
+        detail=False,
+        permission_classes=(IsAdminUser,),
+    )
+    def return_books(self, request):
+        """
+        Return many borrowings on `actual_return_date` in one transaction.
+        Unknown or already returned ids are reported as `skipped`.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = return_borrowings(
+            serializer.validated_data["borrowings"],
+            serializer.validated_data["actual_return_date"],
+        )
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], url_path="summary", detail=False)
+    def summary(self, request):
+        """Loan and payment counters of the current user, cached per user"""
+        data = get_or_compute(
+            summary_key(request.user.id),
+            lambda: self.get_serializer(user_summary(request.user.id)).data,
+            SUMMARY_CACHE_TIMEOUT,
+        )
+        return Response(data)
+
+    @action(methods=["GET"], url_path="history", detail=False)
+    def history(self, request):
+        """
+        All borrowings of the current user, archived ones included.
+        Admins can pass `?user_id=`.
+        """
+        user_id = request.user.id
+        if request.user.is_staff and request.query_params.get("user_id"):
+            user_id = int(request.query_params["user_id"])
+
+        paginator = UnionLimitOffsetPagination()
+        page = paginator.paginate_queryset(
+            borrowing_history(user_id), request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @extend_schema(responses=OpenApiTypes.BINARY)
+    @action(methods=["GET"], url_path="export", detail=False)
+    def export(self, request):
+        """Stream borrowings as NDJSON (default) or CSV with `?type=csv`"""
+        return stream_export(
+            self.get_queryset(),
+            {
+                "id": "id",
+                "borrow_date": "borrow_date",
+                "expected_return_date": "expected_return_date",
+                "actual_return_date": "actual_return_date",
+                "book_id": "book_id",
+                "book_title": "book__title",
+                "user_email": "user__email",
+                "payment_status": "payment__status",
+                "money_to_pay": "payment__money_to_pay",
+            },
+            request.query_params.get("type", "ndjson"),
+            "borrowings",
+        )
+
     # Only for documentation purposes
     @extend_schema(
+        description="Borrowings that are not archived yet. Loans archived "
+                    "after their return are listed by `history/`.",
         parameters=[
             OpenApiParameter(
                 "is_active",
@@ -140,3 +287,34 @@ class BorrowingViewSet(
     )
     def list(self, request, *args, **kwargs):
         return super(BorrowingViewSet, self).list(request, *args, **kwargs)
+
+
+class HoldViewSet(
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Waitlist of the current user. A hold can only be placed on a book that
+    is out of stock; the copy is set aside for the user when it comes back.
+    """
+
+    serializer_class = HoldSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        return (
+            Hold.objects.filter(user=self.request.user)
+            .select_related("book")
+            .annotate(position=queue_position())
+        )
+
+    def perform_create(self, serializer):
+        hold = serializer.save(user=self.request.user)
+        # Re-read with the queue position annotation for the response
+        serializer.instance = self.get_queryset().get(pk=hold.pk)
+
+    def perform_destroy(self, instance):
+        cancel_hold(instance)
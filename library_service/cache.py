@@ -0,0 +1,49 @@
+import time
+
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = 60 * 15
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2
+LOCK_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+def version(version_key: str) -> int:
+    """Current value of a version counter, started on first use"""
+    return cache.get_or_set(version_key, time.time_ns(), None)
+
+
+def bump_versions(version_keys) -> None:
+    """Move version counters on, orphaning every key built from them"""
+    now = time.time_ns()
+    cache.set_many({key: now for key in version_keys}, None)
+
+
+def get_or_compute(key: str, compute, timeout: int = DEFAULT_TIMEOUT):
+    """
+    Read-through cache with single-flight misses: only the caller holding
+    the lock queries the database, concurrent callers wait for its result.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+    return compute()
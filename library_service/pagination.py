@@ -0,0 +1,92 @@
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+def estimate_count(queryset, cap: int) -> tuple:
+    """
+    Cheap row estimate for a queryset, never a full COUNT(*), together with
+    whether it is an estimate. PostgreSQL answers from the planner, other
+    backends count at most `cap` rows, so the result there is exact below
+    the cap and a lower bound once it reaches it.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+
+    count = queryset[:cap].count()
+    return count, count >= cap
+
+
+class EstimatedCountCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "count"
+    estimated_count_cap = 10_000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "estimated":
+            self.count, self.count_is_estimate = estimate_count(
+                queryset, self.estimated_count_cap
+            )
+
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+            response.data["count_is_estimate"] = self.count_is_estimate
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {
+            "type": "integer",
+            "example": 123,
+        }
+        response_schema["properties"]["count_is_estimate"] = {
+            "type": "boolean",
+            "example": False,
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Pass `estimated` to include an estimated "
+                               "total count without a full table count",
+                "schema": {"type": "string", "enum": ["estimated"]},
+            }
+        )
+        return parameters
+
+
+class IdCursorPagination(EstimatedCountCursorPagination):
+    ordering = "id"
+
+
+class BorrowDateCursorPagination(EstimatedCountCursorPagination):
+    ordering = ("-borrow_date", "-id")
+
+
+class UnionLimitOffsetPagination(LimitOffsetPagination):
+    """For combined (`union()`) querysets, which cursors cannot filter"""
+
+    default_limit = 20
+    max_limit = 100
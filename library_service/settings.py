@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
     "user",
     "borrowings",
     "payments",
+    "notifications",
     "stripe",
 ]
 
@@ -148,6 +151,8 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
 }
 
+PAYMENT_GATEWAY = "payments.gateway.StripeGateway"
+
 CELERY_BROKER_URL = "redis://127.0.0.1:6380/0"
 
 CELERY_RESULT_BACKEND = "django-db"
@@ -162,3 +167,30 @@ CACHES = {
 CELERY_CACHE_BACKEND = "default"
 
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+
+CELERY_BEAT_SCHEDULE = {
+    "send-outbox": {
+        "task": "notifications.tasks.send_outbox",
+        "schedule": 60.0,
+    },
+    "accrue-fines": {
+        "task": "borrowings.tasks.accrue_fines",
+        "schedule": crontab(hour=1, minute=0),
+    },
+    "recompute-balances": {
+        "task": "payments.tasks.recompute_outstanding_balances",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    "expire-holds": {
+        "task": "borrowings.tasks.expire_holds",
+        "schedule": crontab(minute=0),
+    },
+    "reconcile-payments": {
+        "task": "payments.tasks.reconcile_payments",
+        "schedule": crontab(minute="*/15"),
+    },
+    "archive-borrowings": {
+        "task": "borrowings.tasks.archive_borrowings",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
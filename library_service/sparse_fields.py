@@ -0,0 +1,63 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _param_set(request, name: str):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {field.strip() for field in value.split(",") if field.strip()}
+
+
+def is_field_kept(request, field_name: str) -> bool:
+    """Whether `?fields=` / `?omit=` of a read request keep `field_name`"""
+    if request is None or request.method not in SAFE_METHODS:
+        return True
+
+    fields = _param_set(request, FIELDS_PARAM)
+    if fields is not None and field_name not in fields:
+        return False
+
+    omit = _param_set(request, OMIT_PARAM)
+    return not (omit and field_name in omit)
+
+
+def sparse_related(request, relations: dict) -> set:
+    """
+    `relations` maps serializer fields to the `select_related` paths they
+    read. Return only the paths still needed by the requested fields.
+    """
+    return {
+        path
+        for field_name, paths in relations.items()
+        if is_field_kept(request, field_name)
+        for path in paths
+    }
+
+
+class SparseFieldsMixin:
+    """
+    Lets read requests choose top-level fields with `?fields=a,b` or drop
+    them with `?omit=c`. Nested serializers are left whole.
+    """
+
+    def _is_root(self) -> bool:
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+
+        request = self.context.get("request")
+        return {
+            name: field
+            for name, field in fields.items()
+            if is_field_kept(request, name)
+        }
@@ -1,14 +1,23 @@
 import os
 
 import requests
+from requests.adapters import HTTPAdapter
 
 BOT_TOKEN = os.environ.get("TELEGRAM_TOKEN")
 CHAT_ID = os.environ.get("CHAT_ID")
 API_URL = "https://api.telegram.org/"
+TIMEOUT = (3.05, 10)
+# Telegram rejects longer messages
+MAX_MESSAGE_LENGTH = 4096
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
 
 
 def send_message(message: str) -> None:
-    requests.post(
+    response = _session.post(
         f"{API_URL}{BOT_TOKEN}/sendMessage",
         params={"chat_id": CHAT_ID, "text": message},
+        timeout=TIMEOUT,
     )
+    response.raise_for_status()
@@ -0,0 +1,18 @@
+"""
+Settings for the test suite, selected by `manage.py test`. Elsewhere, e.g.
+under pytest, set `DJANGO_SETTINGS_MODULE=library_service.test_settings`.
+"""
+from library_service.settings import *  # noqa: F401, F403
+
+# Tests must not depend on a running Redis
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# ... nor on a Celery broker: queued tasks run inline
+CELERY_TASK_ALWAYS_EAGER = True
+
+# ... nor on reaching Stripe
+PAYMENT_GATEWAY = "payments.gateway.FakeGateway"
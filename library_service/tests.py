@@ -0,0 +1,241 @@
+import abc
+import datetime
+import threading
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.tests.test_book_api import sample_book
+from borrowings.tests.test_borrowing_api import (
+    mock_checkout_services,
+    sample_borrowing,
+)
+from borrowings.models import BookLoanSummary
+from library_service.cache import get_or_compute
+from payments.models import OutstandingBalance
+from payments.tests import sample_payment
+
+
+# `url` and `data` are built from the dict returned by `QueryBudgetMixin.fill`
+QueryBudget = namedtuple(
+    "QueryBudget", "name method url max_queries data staff_only"
+)
+QueryBudget.__new__.__defaults__ = (None, False)
+
+
+class QueryBudgetMixin(abc.ABC):
+    """
+    Runs every declared endpoint against datasets of `dataset_sizes` rows
+    and fails when one needs more than its budget, or when the number of
+    queries grows with the dataset (an N+1). `fill` creates a dataset and
+    returns a dict with at least the `user` to authenticate as, a staff
+    user when `as_staff` is set. Without it, `staff_only` budgets are
+    skipped.
+    """
+
+    budgets = ()
+    dataset_sizes = (1, 5, 25)
+    as_staff = True
+
+    def setUp(self):
+        self.client = APIClient()
+        mock_checkout_services(self)
+
+    @abc.abstractmethod
+    def fill(self, size: int) -> dict:
+        """Create a dataset of `size` rows, see the class docstring"""
+
+    def active_budgets(self) -> list:
+        return [
+            budget
+            for budget in self.budgets
+            if self.as_staff or not budget.staff_only
+        ]
+
+    def count_queries(self, budget: QueryBudget, fixture: dict) -> int:
+        self.client.force_authenticate(fixture["user"])
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.client, budget.method)(
+                budget.url(fixture),
+                budget.data and budget.data(fixture),
+                format="json",
+            )
+            if res.streaming:
+                b"".join(res.streaming_content)
+        self.assertLess(res.status_code, 400, f"{budget.name}: {res}")
+        return len(queries)
+
+    def test_query_budgets(self):
+        budgets = self.active_budgets()
+        counts = {budget.name: set() for budget in budgets}
+        for size in self.dataset_sizes:
+            fixture = self.fill(size)
+            for budget in budgets:
+                counts[budget.name].add(self.count_queries(budget, fixture))
+
+        for budget in budgets:
+            with self.subTest(budget.name):
+                self.assertLessEqual(max(counts[budget.name]), budget.max_queries)
+                self.assertEqual(
+                    len(counts[budget.name]),
+                    1,
+                    f"{budget.name} grows with the dataset: "
+                    f"{sorted(counts[budget.name])}",
+                )
+
+
+class ApiQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # Reads are a single query whatever the page holds. The book and user of
+    # a checkout already have their loan summary and balance rows, as they
+    # do after their first loan.
+    budgets = (
+        QueryBudget("book list", "get", lambda f: reverse("books:book-list"), 1),
+        QueryBudget(
+            "book detail",
+            "get",
+            lambda f: reverse("books:book-detail", args=[f["book"].id]),
+            1,
+        ),
+        QueryBudget(
+            "book export",
+            "get",
+            lambda f: reverse("books:book-export"),
+            1,
+            staff_only=True,
+        ),
+        QueryBudget(
+            "borrowing list",
+            "get",
+            lambda f: reverse("borrowings:borrowing-list"),
+            1,
+        ),
+        QueryBudget(
+            "borrowing detail",
+            "get",
+            lambda f: reverse(
+                "borrowings:borrowing-detail", args=[f["borrowing"].id]
+            ),
+            1,
+        ),
+        QueryBudget(
+            "borrowing export",
+            "get",
+            lambda f: reverse("borrowings:borrowing-export"),
+            1,
+        ),
+        QueryBudget(
+            "borrowing history",
+            "get",
+            lambda f: reverse("borrowings:borrowing-history"),
+            2,
+        ),
+        QueryBudget(
+            "borrowing summary",
+            "get",
+            lambda f: reverse("borrowings:borrowing-summary"),
+            1,
+        ),
+        QueryBudget(
+            "payment list", "get", lambda f: reverse("payments:payment-list"), 1
+        ),
+        QueryBudget(
+            "payment detail",
+            "get",
+            lambda f: reverse("payments:payment-detail", args=[f["payment"].id]),
+            1,
+        ),
+        QueryBudget(
+            "payment detail compact",
+            "get",
+            lambda f: reverse("payments:payment-detail", args=[f["payment"].id])
+            + "?compact=true",
+            1,
+        ),
+        QueryBudget(
+            "payment export",
+            "get",
+            lambda f: reverse("payments:payment-export"),
+            1,
+        ),
+        QueryBudget(
+            "borrowing create",
+            "post",
+            lambda f: reverse("borrowings:borrowing-list"),
+            11,
+            lambda f: {"book": f["book"].id},
+        ),
+        QueryBudget(
+            "borrowing return",
+            "put",
+            lambda f: reverse(
+                "borrowings:borrowing-return-book", args=[f["returning"].id]
+            ),
+            8,
+            lambda f: {"actual_return_date": datetime.date.today()},
+        ),
+        QueryBudget(
+            "borrowing bulk return",
+            "post",
+            lambda f: reverse("borrowings:borrowing-return-books"),
+            9,
+            lambda f: {
+                "borrowings": f["borrowings"],
+                "actual_return_date": datetime.date.today(),
+            },
+            staff_only=True,
+        ),
+        QueryBudget("me", "get", lambda f: reverse("users:manage"), 0),
+    )
+
+    def fill(self, size: int) -> dict:
+        create_user = get_user_model().objects.create_user
+        if self.as_staff:
+            create_user = get_user_model().objects.create_superuser
+        user = create_user(f"budget{size}@test.com", "testpass")
+        expires_at = timezone.now() + datetime.timedelta(hours=1)
+        borrowings = []
+        for index in range(size):
+            book = sample_book(title=f"Budget {size}-{index}")
+            borrowing = sample_borrowing(user=user, book=book)
+            borrowings.append(borrowing.id)
+            payment = sample_payment(
+                status="PAID",
+                borrowing=borrowing,
+                session_id=f"cs_{borrowing.id}",
+                session_expires_at=expires_at,
+            )
+        BookLoanSummary.objects.create(book=book)
+        OutstandingBalance.objects.get_or_create(user=user)
+        return {
+            "user": user,
+            "returning": sample_borrowing(user=user, book=book),
+            "book": book,
+            "borrowing": borrowing,
+            "borrowings": borrowings,
+            "payment": payment,
+        }
+
+
+class RegularUserApiQueryBudgetTests(ApiQueryBudgetTests):
+    # Readers see their own rows only, through the joined ownership filters
+    as_staff = False
+
+
+class SingleFlightCacheTests(TestCase):
+    def test_concurrent_miss_waits_for_lock_holder(self):
+        key = "test:single-flight"
+        cache.add(f"{key}:lock", 1)
+        threading.Timer(0.1, cache.set, args=(key, "filled")).start()
+
+        def compute():
+            raise AssertionError("Waiting caller must not hit the database")
+
+        self.assertEqual(get_or_compute(key, compute), "filled")
@@ -0,0 +1,120 @@
+from functools import cached_property
+from operator import itemgetter
+
+from rest_framework import serializers
+
+from library_service.sparse_fields import is_field_kept
+
+# Fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def _path(source: str) -> str:
+    return source.replace(".", "__")
+
+
+def _compile(path: str, field):
+    """Row mapper reproducing `field.to_representation` for one column"""
+    get = itemgetter(path)
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return get
+
+    to_representation = field.to_representation
+
+    def mapper(row):
+        value = get(row)
+        return None if value is None else to_representation(value)
+
+    return mapper
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a list serializer. Rows come from
+    `QuerySet.values()` and every field is turned into a precompiled mapper,
+    so the output matches `serializer_class` without building model
+    instances or walking DRF fields per row.
+
+    `paths` overrides the ORM path of a field, `mappers` replaces the mapper
+    of fields that are computed (e.g. `SerializerMethodField`) and must then
+    name the extra columns they read in `mapper_paths`.
+    """
+
+    def __init__(
+        self,
+        serializer_class,
+        paths: dict = None,
+        mappers: dict = None,
+        mapper_paths: dict = None,
+    ):
+        self.serializer_class = serializer_class
+        self.paths = paths or {}
+        self.mappers = mappers or {}
+        self.mapper_paths = mapper_paths or {}
+
+    @cached_property
+    def fields(self) -> dict:
+        """`{name: (mapper, paths)}`, compiled once on first use"""
+        fields = {}
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.mappers:
+                fields[name] = (self.mappers[name], self.mapper_paths[name])
+                continue
+            path = self.paths.get(name) or _path(field.source)
+            fields[name] = (_compile(path, field), (path,))
+        return fields
+
+    def select(self, request) -> dict:
+        """Mappers of the fields kept by `?fields=` / `?omit=`"""
+        return {
+            name: field
+            for name, field in self.fields.items()
+            if is_field_kept(request, name)
+        }
+
+    def values(self, queryset, fields: dict, extra_paths=()):
+        paths = set(extra_paths)
+        for _, field_paths in fields.values():
+            paths.update(field_paths)
+        return queryset.values(*sorted(paths))
+
+    @staticmethod
+    def to_representation(rows, fields: dict) -> list:
+        names = list(fields)
+        mappers = [mapper for mapper, _ in fields.values()]
+        return [
+            dict(zip(names, [mapper(row) for mapper in mappers]))
+            for row in rows
+        ]
+
+
+class ValuesListMixin:
+    """
+    Serves the `list` action through `values_serializer` instead of the
+    model serializer, keeping filtering, cursor pagination and sparse
+    fields.
+    """
+
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.values_serializer.select(request)
+        ordering = self.paginator.get_ordering(request, queryset, self)
+        rows = self.values_serializer.values(
+            queryset,
+            fields,
+            extra_paths=[field.lstrip("-") for field in ordering],
+        )
+
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(
+            self.values_serializer.to_representation(page, fields)
+        )
@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from notifications.models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at", "attempts", "next_attempt_at")
+    readonly_fields = ("created_at", "attempts", "last_error")
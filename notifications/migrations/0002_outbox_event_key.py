@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="key",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    Telegram message written in the same transaction as the change it
+    reports and delivered by `notifications.tasks.send_outbox` afterwards.
+    """
+
+    # Event reported, e.g. `hold-ready:12`; messages sharing a key are sent
+    # once. Messages without a key are never merged.
+    key = models.CharField(max_length=255, blank=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                name="outbox_next_attempt_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:50]
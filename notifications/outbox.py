@@ -0,0 +1,56 @@
+from django.db import transaction
+
+from library_service.telegram_bot import MAX_MESSAGE_LENGTH
+from notifications.models import OutboxMessage
+
+
+def notify(text: str, key: str = "") -> OutboxMessage:
+    """
+    Queue a Telegram message in the current transaction. It is sent by a
+    worker after commit, so callers never wait on Telegram. `key` names the
+    event (`"<type>:<object id>"`) so repeats of it are delivered once.
+    """
+    from notifications.tasks import send_outbox
+
+    message = OutboxMessage.objects.create(key=key, text=text)
+    transaction.on_commit(send_outbox.delay)
+    return message
+
+
+def notify_many(messages) -> None:
+    """Queue `(key, text)` pairs with one INSERT, see `notify`"""
+    from notifications.tasks import send_outbox
+
+    if not messages:
+        return
+    OutboxMessage.objects.bulk_create(
+        OutboxMessage(key=key, text=text) for key, text in messages
+    )
+    transaction.on_commit(send_outbox.delay)
+
+
+def coalesce(messages) -> list:
+    """
+    Merge queued messages into as few Telegram messages as possible.
+    Messages with the same event key are sent once. Returns
+    `(text, [message ids])` pairs.
+    """
+    batches = []
+    seen = {}
+    for message in messages:
+        if message.key and message.key in seen:
+            seen[message.key][1].append(message.id)
+            continue
+
+        text = message.text[:MAX_MESSAGE_LENGTH]
+        if batches and len(batches[-1][0]) + len(text) + 2 <= MAX_MESSAGE_LENGTH:
+            batch = batches[-1]
+            batch[0] = f"{batch[0]}\n\n{text}"
+        else:
+            batch = [text, []]
+            batches.append(batch)
+        batch[1].append(message.id)
+        if message.key:
+            seen[message.key] = batch
+
+    return [(text, ids) for text, ids in batches]
@@ -0,0 +1,75 @@
+import datetime
+
+import requests
+from celery import shared_task
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from library_service import telegram_bot
+from notifications.models import OutboxMessage
+from notifications.outbox import coalesce
+
+OUTBOX_BATCH_SIZE = 200
+BACKOFF_BASE = datetime.timedelta(seconds=30)
+BACKOFF_MAX = datetime.timedelta(hours=1)
+# Longer than sending a whole batch may take
+CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def backoff(attempts: int) -> datetime.timedelta:
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+
+def claim_batch() -> list:
+    """
+    Lock the due messages only long enough to push their next attempt past
+    `CLAIM_TIMEOUT`, so other workers skip them while this one sends. A
+    worker that dies mid-send leaves them due again once the claim lapses.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:OUTBOX_BATCH_SIZE]
+        )
+        OutboxMessage.objects.filter(
+            id__in=[message.id for message in messages]
+        ).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return messages
+
+
+@shared_task(bind=True, max_retries=5)
+def send_outbox(self):
+    """
+    Deliver due outbox messages in coalesced batches. Telegram is called
+    outside any transaction; failed batches are rescheduled with
+    exponential backoff.
+    """
+    sent = failed = 0
+    messages = claim_batch()
+    attempts = {message.id: message.attempts for message in messages}
+
+    for text, ids in coalesce(messages):
+        try:
+            telegram_bot.send_message(text)
+        except requests.RequestException as error:
+            failed += len(ids)
+            retry_in = backoff(max(attempts[i] for i in ids) + 1)
+            OutboxMessage.objects.filter(id__in=ids).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=timezone.now() + retry_in,
+                last_error=str(error),
+            )
+        else:
+            sent += len(ids)
+            OutboxMessage.objects.filter(id__in=ids).delete()
+
+    if failed:
+        raise self.retry(countdown=retry_in.total_seconds())
+
+    if len(messages) == OUTBOX_BATCH_SIZE:
+        send_outbox.delay()
+
+    return f"Sent {sent} outbox messages"
@@ -0,0 +1,87 @@
+from unittest import mock
+
+import requests
+from django.test import TestCase
+from django.utils import timezone
+
+from notifications.models import OutboxMessage
+from notifications.outbox import coalesce, notify
+from notifications.tasks import claim_batch, send_outbox
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("library_service.telegram_bot.send_message")
+        self.send_message = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_notify_sends_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify("New Borrowing")
+            self.send_message.assert_not_called()
+
+        self.send_message.assert_called_once_with("New Borrowing")
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_messages_are_batched_and_deduplicated_by_key(self):
+        for key, text in (("a:1", "first"), ("b:1", "second"), ("a:1", "first")):
+            OutboxMessage.objects.create(key=key, text=text)
+
+        send_outbox.apply()
+
+        self.send_message.assert_called_once_with("first\n\nsecond")
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_distinct_events_with_same_text_are_all_sent(self):
+        for key in ("overdue:1", "overdue:2", ""):
+            OutboxMessage.objects.create(key=key, text="Overdue")
+
+        send_outbox.apply()
+
+        self.send_message.assert_called_once_with(
+            "Overdue\n\nOverdue\n\nOverdue"
+        )
+
+    def test_batch_is_claimed_before_sending(self):
+        OutboxMessage.objects.create(text="New Borrowing")
+
+        def send(text):
+            # Claimed for other workers while Telegram is called
+            self.assertFalse(claim_batch())
+            message = OutboxMessage.objects.get()
+            self.assertGreater(message.next_attempt_at, timezone.now())
+
+        self.send_message.side_effect = send
+
+        send_outbox.apply()
+
+        self.send_message.assert_called_once()
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_coalesce_splits_long_batches(self):
+        messages = [
+            OutboxMessage(id=index, text=str(index) * 3000) for index in range(3)
+        ]
+
+        self.assertEqual(len(coalesce(messages)), 3)
+
+    def test_failed_delivery_backs_off(self):
+        self.send_message.side_effect = requests.ConnectionError("down")
+        message = OutboxMessage.objects.create(text="New Borrowing")
+
+        send_outbox.apply()
+
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertIn("down", message.last_error)
+
+    def test_messages_waiting_for_backoff_are_skipped(self):
+        OutboxMessage.objects.create(
+            text="later",
+            next_attempt_at=timezone.now() + timezone.timedelta(minutes=5),
+        )
+
+        send_outbox.apply()
+
+        self.send_message.assert_not_called()
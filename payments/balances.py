@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from borrowings.cache import invalidate_summaries
+from payments.models import OutstandingBalance, Payment
+
+
+def pending_balance(status: str, money_to_pay) -> tuple:
+    """`(count, amount)` a payment in this state adds to its user's balance"""
+    if status != "PENDING":
+        return 0, Decimal(0)
+    return 1, Decimal(str(money_to_pay))
+
+
+def pending_balance_of(payment: Payment) -> tuple:
+    return pending_balance(payment.status, payment.money_to_pay)
+
+
+def pending_by_user(payments) -> dict:
+    """`{user_id: (count, amount)}` of the pending ones among `payments`"""
+    return {
+        row["borrowing__user_id"]: (row["pending_count"], row["pending_amount"])
+        for row in payments.filter(status="PENDING")
+        .values("borrowing__user_id")
+        .annotate(pending_count=Count("id"), pending_amount=Sum("money_to_pay"))
+        .order_by()
+    }
+
+
+def adjust_balance(user_id: int, count: int, amount: Decimal) -> None:
+    """
+    Shift a user's outstanding balance by `count` payments and `amount`.
+    Bulk writes that skip model signals must call this themselves.
+    """
+    if not count and not amount:
+        return
+
+    changes = {
+        "pending_count": F("pending_count") + count,
+        "pending_amount": F("pending_amount") + amount,
+    }
+    balances = OutstandingBalance.objects.filter(user_id=user_id)
+    if not balances.update(**changes):
+        OutstandingBalance.objects.get_or_create(user_id=user_id)
+        balances.update(**changes)
+    invalidate_summaries([user_id])
+
+
+def recompute_balances() -> int:
+    """
+    Rebuild every balance from the payments, repairing any drift. The
+    balance rows are locked first, so payment changes made meanwhile wait
+    and apply their own adjustment on top. Returns how many were fixed.
+    """
+    with transaction.atomic():
+        balances = {
+            balance.user_id: balance
+            for balance in OutstandingBalance.objects.select_for_update()
+        }
+        pending = pending_by_user(Payment.objects.all())
+
+        changed = []
+        for user_id in balances.keys() | pending.keys():
+            count, amount = pending.get(user_id, (0, Decimal(0)))
+            balance = balances.get(user_id) or OutstandingBalance(user_id=user_id)
+            if (balance.pending_count, balance.pending_amount) != (count, amount):
+                balance.pending_count, balance.pending_amount = count, amount
+                changed.append(balance)
+
+        OutstandingBalance.objects.bulk_create(
+            balance for balance in changed if balance.user_id not in balances
+        )
+        OutstandingBalance.objects.bulk_update(
+            [balance for balance in changed if balance.user_id in balances],
+            ["pending_count", "pending_amount"],
+        )
+        invalidate_summaries(balance.user_id for balance in changed)
+    return len(changed)
+
+
+def has_pending_payments(user) -> bool:
+    return OutstandingBalance.objects.filter(
+        user=user, pending_count__gt=0
+    ).exists()
@@ -0,0 +1,17 @@
+from django.core.checks import Warning, register
+
+from payments import webhooks
+
+
+@register(deploy=True)
+def check_webhook_secret(app_configs, **kwargs):
+    if webhooks.WEBHOOK_SECRET:
+        return []
+    return [
+        Warning(
+            "STRIPE_WEBHOOK_SECRET is not set.",
+            hint="The Stripe webhook refuses every event until it is set, "
+                 "so payments are settled only by reconcile_payments.",
+            id="payments.W001",
+        )
+    ]
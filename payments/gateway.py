@@ -0,0 +1,355 @@
+"""
+Payment provider access. Every call goes through `PaymentGateway.call`,
+which bounds it with a bulkhead (calls in flight), a circuit breaker and
+a few retries, so a slow or failing provider cannot tie up every worker.
+`get_gateway` returns the gateway named by `settings.PAYMENT_GATEWAY`.
+"""
+import abc
+import datetime
+import functools
+import itertools
+import os
+import threading
+import time
+from collections import namedtuple
+
+import requests
+import stripe
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from stripe.http_client import RequestsClient
+
+stripe.api_key = os.environ.get("API_KEY")
+
+TIMEOUT = (3.05, 15)
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5
+MAX_IN_FLIGHT = 8
+BULKHEAD_WAIT = 1.0
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+SESSION_LIFETIME = datetime.timedelta(hours=24)
+LIST_PAGE_SIZE = 100
+
+SUCCESS_URL = (
+    "http://localhost:8000/api/"
+    "payments/success?session_id={CHECKOUT_SESSION_ID}"
+)
+CANCEL_URL = "http://localhost:8000/api/payments/cancel"
+
+CheckoutSession = namedtuple(
+    "CheckoutSession", "id url status payment_status created expires_at"
+)
+
+
+class GatewayError(Exception):
+    """The payment provider call failed"""
+
+
+class GatewayUnavailable(GatewayError):
+    """The call was not attempted: breaker open or too many in flight"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` failed calls in a row. Once
+    `reset_timeout` seconds passed it lets a single trial call through,
+    which closes it again on success.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+    def release_trial(self) -> None:
+        """Free the trial slot of a call that ended without an outcome"""
+        with self._lock:
+            self._trial = False
+
+
+class PaymentGateway(abc.ABC):
+    # Errors worth retrying, which also count against the breaker
+    retryable = ()
+    # Other provider errors, e.g. a rejected request
+    errors = ()
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        bulkhead_wait: float = BULKHEAD_WAIT,
+        max_retries: int = MAX_RETRIES,
+        retry_backoff: float = RETRY_BACKOFF,
+        breaker: CircuitBreaker = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.bulkhead_wait = bulkhead_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def call(self, func, *args, **kwargs):
+        if not self.breaker.allow():
+            raise GatewayUnavailable("Payment provider circuit is open")
+        if not self._in_flight.acquire(timeout=self.bulkhead_wait):
+            self.breaker.release_trial()
+            raise GatewayUnavailable("Too many payment provider calls in flight")
+
+        try:
+            for attempt in itertools.count():
+                try:
+                    result = func(*args, **kwargs)
+                except self.retryable as error:
+                    if attempt >= self.max_retries:
+                        self.breaker.record_failure()
+                        raise GatewayError(str(error)) from error
+                    time.sleep(self.retry_backoff * 2**attempt)
+                except self.errors as error:
+                    raise GatewayError(str(error)) from error
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            # A no-op after record_success / record_failure
+            self.breaker.release_trial()
+            self._in_flight.release()
+
+    @abc.abstractmethod
+    def create_session(
+        self, title: str, price, idempotency_key: str = None
+    ) -> CheckoutSession:
+        """Open a Checkout session, the same one again for a repeated key"""
+
+    @abc.abstractmethod
+    def expire_session(self, session_id: str) -> CheckoutSession:
+        """
+        Close an open session so it can no longer be paid. A session that
+        is not open any more is returned as it is, e.g. already complete.
+        """
+
+    @abc.abstractmethod
+    def list_sessions(self, created_since: int, page_size: int = LIST_PAGE_SIZE):
+        """Pages (lists) of the sessions created at or after `created_since`"""
+
+
+def _expiry(expires_at):
+    if not expires_at:
+        return timezone.now() + SESSION_LIFETIME
+    return datetime.datetime.fromtimestamp(expires_at, tz=datetime.timezone.utc)
+
+
+class StripeGateway(PaymentGateway):
+    retryable = (
+        stripe.error.APIConnectionError,
+        stripe.error.RateLimitError,
+        stripe.error.APIError,
+    )
+    errors = (stripe.error.StripeError,)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        session = requests.Session()
+        session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight),
+        )
+        # The stripe library sends every request through one shared client
+        stripe.default_http_client = RequestsClient(
+            timeout=TIMEOUT, session=session
+        )
+
+    @staticmethod
+    def _session(session) -> CheckoutSession:
+        return CheckoutSession(
+            session.id,
+            session.get("url"),
+            session.get("status"),
+            session.get("payment_status"),
+            session.get("created"),
+            _expiry(session.get("expires_at")),
+        )
+
+    def create_session(self, title, price, idempotency_key=None):
+        session = self.call(
+            stripe.checkout.Session.create,
+            line_items=[
+                {
+                    "price_data": {
+                        "currency": "usd",
+                        "product_data": {
+                            "name": title,
+                        },
+                        "unit_amount": int(price * 100),
+                    },
+                    "quantity": 1,
+                }
+            ],
+            mode="payment",
+            success_url=SUCCESS_URL,
+            cancel_url=CANCEL_URL,
+            idempotency_key=idempotency_key,
+        )
+        return self._session(session)
+
+    def expire_session(self, session_id):
+        try:
+            session = self.call(stripe.checkout.Session.expire, session_id)
+        except GatewayError as error:
+            if not isinstance(error.__cause__, stripe.error.InvalidRequestError):
+                raise
+            # Only open sessions can be expired, report what it became
+            session = self.call(stripe.checkout.Session.retrieve, session_id)
+        return self._session(session)
+
+    def list_sessions(self, created_since, page_size=LIST_PAGE_SIZE):
+        params = {"created": {"gte": created_since}, "limit": page_size}
+        while True:
+            page = self.call(stripe.checkout.Session.list, **params)
+            sessions = [self._session(session) for session in page.data]
+            if sessions:
+                yield sessions
+            if not page.has_more:
+                return
+            params["starting_after"] = sessions[-1].id
+
+
+class FakeGatewayOutage(ConnectionError):
+    pass
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-process stand-in for Stripe, for tests and benchmarks. `fail(n)`
+    makes the next `n` provider calls fail like a network error would.
+    """
+
+    retryable = (FakeGatewayOutage,)
+    # Unknown session ids
+    errors = (LookupError,)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("retry_backoff", 0)
+        super().__init__(**kwargs)
+        self.sessions = {}
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def fail(self, times: int = 1) -> None:
+        self._failures = times
+
+    def _outage(self):
+        if self._failures:
+            self._failures -= 1
+            raise FakeGatewayOutage("Fake payment provider is down")
+
+    def _create(self, title, price, idempotency_key):
+        with self._lock:
+            self._outage()
+            if idempotency_key in self._by_key:
+                return self._by_key[idempotency_key]
+
+            session_id = f"cs_fake_{next(self._ids)}"
+            session = CheckoutSession(
+                session_id,
+                f"https://checkout.stripe.test/pay/{session_id}",
+                "open",
+                "unpaid",
+                int(time.time()),
+                timezone.now() + SESSION_LIFETIME,
+            )
+            self.sessions[session_id] = session
+            if idempotency_key:
+                self._by_key[idempotency_key] = session
+            return session
+
+    def create_session(self, title, price, idempotency_key=None):
+        return self.call(self._create, title, price, idempotency_key)
+
+    def _expire(self, session_id):
+        with self._lock:
+            self._outage()
+            session = self.sessions[session_id]
+            if session.status == "open":
+                session = session._replace(status="expired")
+                self.sessions[session_id] = session
+            return session
+
+    def expire_session(self, session_id):
+        return self.call(self._expire, session_id)
+
+    def _list(self, created_since, page_size, offset):
+        with self._lock:
+            self._outage()
+            sessions = sorted(
+                (
+                    session
+                    for session in self.sessions.values()
+                    if session.created >= created_since
+                ),
+                key=lambda session: (session.created, session.id),
+            )
+            return sessions[offset : offset + page_size]
+
+    def list_sessions(self, created_since, page_size=LIST_PAGE_SIZE):
+        for offset in itertools.count(0, page_size):
+            sessions = self.call(self._list, created_since, page_size, offset)
+            if not sessions:
+                return
+            yield sessions
+
+    def complete(self, session_id: str) -> CheckoutSession:
+        session = self.sessions[session_id]._replace(
+            status="complete", payment_status="paid"
+        )
+        self.sessions[session_id] = session
+        return session
+
+    def expire(self, session_id: str) -> CheckoutSession:
+        session = self.sessions[session_id]._replace(status="expired")
+        self.sessions[session_id] = session
+        return session
+
+
+@functools.lru_cache(maxsize=None)
+def get_gateway() -> PaymentGateway:
+    return import_string(settings.PAYMENT_GATEWAY)()
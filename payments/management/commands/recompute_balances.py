@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payments.balances import recompute_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuild outstanding balances from the pending payments"
+
+    def handle(self, *args, **options):
+        fixed = recompute_balances()
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} balances"))
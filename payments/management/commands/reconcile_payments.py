@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from payments.gateway import LIST_PAGE_SIZE
+from payments.reconciliation import reconcile_sessions
+
+
+class Command(BaseCommand):
+    help = "Settle payments from Stripe Checkout sessions created since last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=LIST_PAGE_SIZE)
+        parser.add_argument(
+            "--since",
+            type=int,
+            help="Unix timestamp to list sessions from instead of the checkpoint",
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_sessions(options["page_size"], options["since"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {result['sessions']} sessions: {result['paid']} paid, "
+                f"{result['expired']} expired"
+            )
+        )
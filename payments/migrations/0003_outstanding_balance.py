@@ -0,0 +1,57 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_balances(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    OutstandingBalance = apps.get_model("payments", "OutstandingBalance")
+
+    OutstandingBalance.objects.bulk_create(
+        OutstandingBalance(
+            user_id=row["borrowing__user"],
+            pending_count=row["pending_count"],
+            pending_amount=row["pending_amount"],
+        )
+        for row in Payment.objects.filter(status="PENDING")
+        .values("borrowing__user")
+        .annotate(
+            pending_count=models.Count("id"),
+            pending_amount=models.Sum("money_to_pay"),
+        )
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0001_initial"),
+        ("payments", "0002_alter_payment_session_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutstandingBalance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="outstanding_balance",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("pending_count", models.IntegerField(default=0)),
+                (
+                    "pending_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def clear_duplicate_sessions(apps, schema_editor):
+    """
+    Keep a session id on its newest payment only. The others get a fresh
+    Stripe session the next time they are read.
+    """
+    Payment = apps.get_model("payments", "Payment")
+    Payment.objects.filter(session_id="").update(session_id=None)
+    duplicates = (
+        Payment.objects.exclude(session_id=None)
+        .values("session_id")
+        .annotate(copies=Count("id"), newest=Max("id"))
+        .filter(copies__gt=1)
+    )
+    for duplicate in duplicates:
+        Payment.objects.filter(session_id=duplicate["session_id"]).exclude(
+            id=duplicate["newest"]
+        ).update(session_id=None, session_url="", session_expires_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_deferred_stripe_session"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_sessions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="payment",
+            name="session_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["status"], name="payment_status_idx"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0008_archived_borrowing"),
+        ("payments", "0005_unique_session_id_status_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedPayment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("PENDING", "Pending"), ("PAID", "Paid")], max_length=7
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[("PAYMENT", "Payment"), ("FINE", "Fine")], max_length=7
+                    ),
+                ),
+                ("session_url", models.URLField(blank=True)),
+                ("session_id", models.CharField(blank=True, max_length=255, null=True)),
+                ("session_expires_at", models.DateTimeField(blank=True, null=True)),
+                ("money_to_pay", models.DecimalField(decimal_places=2, max_digits=5)),
+                (
+                    "borrowing",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment",
+                        to="borrowings.archivedborrowing",
+                    ),
+                ),
+            ],
+        ),
+    ]
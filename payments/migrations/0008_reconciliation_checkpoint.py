@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_stripe_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconciliationCheckpoint",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=63, primary_key=True, serialize=False),
+                ),
+                ("created_since", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.db import models
 
-from borrowings.models import Borrowing
+from borrowings.models import ArchivedBorrowing, Borrowing
 
 
 class Payment(models.Model):
@@ -15,6 +16,66 @@ class Payment(models.Model):
     status = models.CharField(max_length=7, choices=STATUS_CHOICES)
     type = models.CharField(max_length=7, choices=TYPE_CHOICES)
     borrowing = models.OneToOneField(Borrowing, on_delete=models.CASCADE)
-    session_url = models.URLField()
-    session_id = models.CharField(max_length=255)
+    session_url = models.URLField(blank=True)
+    session_id = models.CharField(
+        max_length=255, blank=True, null=True, unique=True
+    )
+    session_expires_at = models.DateTimeField(blank=True, null=True)
     money_to_pay = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], name="payment_status_idx"),
+        ]
+
+
+class OutstandingBalance(models.Model):
+    """
+    Pending payments of a user, kept in step with `Payment` rows by
+    `payments.balances` so checkout needs a single primary key lookup.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="outstanding_balance",
+    )
+    pending_count = models.IntegerField(default=0)
+    pending_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0
+    )
+
+    def __str__(self):
+        return f"{self.user}: {self.pending_count} pending"
+
+
+class ArchivedPayment(models.Model):
+    """Settled payment of an `ArchivedBorrowing`, keeping its original id"""
+
+    id = models.BigIntegerField(primary_key=True)
+    status = models.CharField(max_length=7, choices=Payment.STATUS_CHOICES)
+    type = models.CharField(max_length=7, choices=Payment.TYPE_CHOICES)
+    borrowing = models.OneToOneField(
+        ArchivedBorrowing, on_delete=models.CASCADE, related_name="payment"
+    )
+    session_url = models.URLField(blank=True)
+    session_id = models.CharField(max_length=255, blank=True, null=True)
+    session_expires_at = models.DateTimeField(blank=True, null=True)
+    money_to_pay = models.DecimalField(max_digits=5, decimal_places=2)
+
+
+class StripeEvent(models.Model):
+    """Stripe webhook event that was handled, kept to drop redeliveries"""
+
+    id = models.CharField(max_length=255, primary_key=True)
+    type = models.CharField(max_length=63)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+
+class ReconciliationCheckpoint(models.Model):
+    """Where a reconciliation job resumes, as a Stripe `created` timestamp"""
+
+    name = models.CharField(max_length=63, primary_key=True)
+    created_since = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,45 @@
+"""
+Catch up on Checkout sessions whose webhook never arrived, by listing
+sessions from Stripe in pages instead of retrieving them one by one.
+"""
+from payments.gateway import LIST_PAGE_SIZE, get_gateway
+from payments.models import ReconciliationCheckpoint
+from payments.webhooks import forget_sessions, mark_paid_many
+
+CHECKPOINT = "stripe-checkout-sessions"
+
+
+def reconcile_sessions(
+    page_size: int = LIST_PAGE_SIZE, created_since: int = None
+) -> dict:
+    """
+    Settle paid and drop expired sessions created since the checkpoint,
+    a page at a time. The checkpoint then moves to the oldest session that
+    is still open, so sessions are revisited only until they settle.
+    `created_since` overrides the checkpoint, e.g. for a backfill.
+    """
+    checkpoint, _ = ReconciliationCheckpoint.objects.get_or_create(
+        name=CHECKPOINT
+    )
+    if created_since is None:
+        created_since = checkpoint.created_since
+
+    paid = expired = seen = 0
+    newest = created_since
+    oldest_open = None
+    for sessions in get_gateway().list_sessions(created_since, page_size):
+        seen += len(sessions)
+        paid += mark_paid_many(
+            session.id for session in sessions if session.payment_status == "paid"
+        )
+        expired += forget_sessions(
+            session.id for session in sessions if session.status == "expired"
+        )
+        for session in sessions:
+            newest = max(newest, session.created)
+            if session.status == "open":
+                oldest_open = min(oldest_open or session.created, session.created)
+
+    checkpoint.created_since = newest if oldest_open is None else oldest_open
+    checkpoint.save(update_fields=["created_since", "updated_at"])
+    return {"sessions": seen, "paid": paid, "expired": expired}
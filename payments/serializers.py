@@ -1,10 +1,12 @@
 from rest_framework import serializers
 
 from borrowings.serializers import BorrowingDetailSerializer
+from library_service.sparse_fields import SparseFieldsMixin
+from library_service.values_serializers import ValuesSerializer
 from payments.models import Payment
 
 
-class PaymentListSerializer(serializers.ModelSerializer):
+class PaymentListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.CharField(source="borrowing.user.email")
 
     class Meta:
@@ -21,7 +23,10 @@ class PaymentListSerializer(serializers.ModelSerializer):
         )
 
 
-class PaymentDetailSerializer(serializers.ModelSerializer):
+payment_list_values = ValuesSerializer(PaymentListSerializer)
+
+
+class PaymentDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
     borrowing = BorrowingDetailSerializer()
 
@@ -38,6 +43,21 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
         )
 
 
+class PaymentBorrowingSerializer(BorrowingDetailSerializer):
+    """Borrowing of a payment without the payment fields it would repeat"""
+
+    class Meta(BorrowingDetailSerializer.Meta):
+        fields = tuple(
+            name
+            for name in BorrowingDetailSerializer.Meta.fields
+            if not name.startswith("payment_") and name != "money_to_pay"
+        )
+
+
+class PaymentCompactDetailSerializer(PaymentDetailSerializer):
+    borrowing = PaymentBorrowingSerializer()
+
+
 class PaymentSuccessSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
@@ -0,0 +1,104 @@
+import datetime
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from payments.gateway import GatewayError, get_gateway
+from payments.models import Payment
+
+logger = logging.getLogger(__name__)
+
+# Sessions this close to expiring are replaced instead of handed out
+SESSION_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+def create_stripe_session(title: str, price, idempotency_key: str = None) -> tuple:
+    """Open a Checkout session, return its url, id and expiry time"""
+    session = get_gateway().create_session(title, price, idempotency_key)
+    return session.url, session.id, session.expires_at
+
+
+def expire_stripe_session(session_id: str) -> str:
+    """Close a Checkout session so it can no longer be paid, return its status"""
+    return get_gateway().expire_session(session_id).status
+
+
+def has_payable_session(payment: Payment) -> bool:
+    return bool(
+        payment.session_id
+        and payment.session_expires_at
+        and payment.session_expires_at > timezone.now()
+    )
+
+
+def has_fresh_session(payment: Payment) -> bool:
+    return bool(
+        payment.session_url
+        and payment.session_expires_at
+        and payment.session_expires_at > timezone.now() + SESSION_REFRESH_MARGIN
+    )
+
+
+def ensure_session(payment: Payment) -> Payment:
+    """
+    Give a pending `payment` a usable Checkout session, creating one on
+    first use and replacing it once it expires. Updates `payment` in place.
+
+    A session replaced before it expired is closed at the provider first.
+    No row lock is held over the provider calls. Concurrent callers that see
+    the same stale session send the same idempotency key and so get the
+    same new session; the row is locked again only to store it.
+    """
+    if payment.status != "PENDING" or has_fresh_session(payment):
+        return payment
+
+    current = Payment.objects.select_related("borrowing__book").get(pk=payment.pk)
+    if current.status == "PENDING" and not has_fresh_session(current):
+        # A payment on a replaced session would match no row, so close it
+        # first. If it was paid meanwhile the webhook or reconciliation
+        # settles the payment with it.
+        if (
+            has_payable_session(current)
+            and expire_stripe_session(current.session_id) == "complete"
+        ):
+            return payment
+        session = create_stripe_session(
+            current.borrowing.book.title,
+            current.money_to_pay,
+            idempotency_key=f"payment-{current.pk}-{current.session_id or 0}",
+        )
+        with transaction.atomic():
+            locked = Payment.objects.select_for_update().get(pk=payment.pk)
+            # Someone else may have stored a session meanwhile, keep theirs
+            if locked.session_id == current.session_id:
+                (
+                    locked.session_url,
+                    locked.session_id,
+                    locked.session_expires_at,
+                ) = session
+                locked.save(
+                    update_fields=[
+                        "session_url",
+                        "session_id",
+                        "session_expires_at",
+                    ]
+                )
+        current = locked
+
+    payment.session_url = current.session_url
+    payment.session_id = current.session_id
+    payment.session_expires_at = current.session_expires_at
+    return payment
+
+
+def try_ensure_session(payment: Payment) -> Payment:
+    """
+    `ensure_session` for read endpoints: while the provider is unreachable
+    the payment is returned with the session it already has.
+    """
+    try:
+        return ensure_session(payment)
+    except GatewayError:
+        logger.warning("Could not refresh session of payment %s", payment.pk)
+        return payment
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.balances import (
+    adjust_balance,
+    pending_balance,
+    pending_balance_of,
+    pending_by_user,
+)
+from payments.models import Payment
+
+BALANCE_FIELDS = {"status", "money_to_pay"}
+
+# Path to the payments from each model whose deletion removes them
+DELETION_PATHS = {
+    Payment: "pk",
+    Borrowing: "borrowing",
+    Book: "borrowing__book",
+}
+
+
+@receiver(pre_save, sender=Payment)
+def remember_pending_balance(sender, instance, update_fields=None, **kwargs):
+    """
+    Read what the stored row adds to the balance, the instance itself may
+    be stale or have deferred fields. Saves that leave the status and the
+    amount alone skip the lookup.
+    """
+    if instance._state.adding:
+        instance._counted_balance = (0, Decimal(0))
+    elif update_fields is not None and not BALANCE_FIELDS & set(update_fields):
+        instance._counted_balance = None
+    else:
+        row = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list("status", "money_to_pay")
+            .first()
+        )
+        instance._counted_balance = pending_balance(*row) if row else (0, 0)
+
+
+@receiver(post_save, sender=Payment)
+def update_balance_on_save(sender, instance, **kwargs):
+    old = instance._counted_balance
+    if old is None:
+        return
+
+    new = pending_balance_of(instance)
+    if new != old:
+        user_id = instance.borrowing.user_id
+        adjust_balance(user_id, new[0] - old[0], new[1] - old[1])
+
+
+@receiver(pre_delete, sender=Payment)
+def update_balance_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Take the pending payments of a whole deletion, cascades included, off
+    the balances with one aggregate query when its first payment goes.
+    The origin is marked so the payments after it are skipped.
+    """
+    if getattr(origin, "_balances_settled", False):
+        return
+
+    if isinstance(origin, QuerySet):
+        path = DELETION_PATHS.get(origin.model)
+        lookup = {f"{path}__in": origin}
+    else:
+        path = DELETION_PATHS.get(type(origin))
+        lookup = {path: origin.pk}
+    if path is None:
+        # Unknown origin: settle this payment alone
+        origin, lookup = None, {"pk": instance.pk}
+
+    for user_id, (count, amount) in pending_by_user(
+        Payment.objects.filter(**lookup)
+    ).items():
+        adjust_balance(user_id, -count, -amount)
+    if origin is not None:
+        origin._balances_settled = True
@@ -0,0 +1,49 @@
+from celery import shared_task
+from django.db import transaction
+
+from payments.balances import recompute_balances
+from payments.gateway import GatewayError
+from payments.models import Payment
+from payments.reconciliation import reconcile_sessions
+from payments.sessions import ensure_session
+
+
+@shared_task(autoretry_for=(GatewayError,), retry_backoff=True, max_retries=5)
+def create_payment_session(payment_id: int):
+    payment = Payment.objects.filter(pk=payment_id).first()
+    if payment is None:
+        return f"Payment {payment_id} no longer exists"
+
+    ensure_session(payment)
+    return f"Payment {payment_id} session: {payment.session_id}"
+
+
+@shared_task(autoretry_for=(GatewayError,), retry_backoff=True, max_retries=3)
+def reconcile_payments():
+    result = reconcile_sessions()
+    return (
+        f"{result['sessions']} sessions checked, {result['paid']} payments "
+        f"settled, {result['expired']} sessions expired"
+    )
+
+
+@shared_task
+def recompute_outstanding_balances():
+    return f"Fixed {recompute_balances()} balances"
+
+
+def schedule_payment_session(payment: Payment) -> None:
+    """Prepare the Checkout session in the background once committed"""
+    transaction.on_commit(lambda: create_payment_session.delay(payment.pk))
+
+
+def schedule_payment_sessions(payment_ids) -> None:
+    """`schedule_payment_session` for many payments, queued once committed"""
+    payment_ids = list(payment_ids)
+
+    def enqueue():
+        for payment_id in payment_ids:
+            create_payment_session.delay(payment_id)
+
+    if payment_ids:
+        transaction.on_commit(enqueue)
@@ -1,3 +1,715 @@
+import datetime
+import hashlib
+import hmac
+import json
+import time
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from books.inventory import enable_sharding
+from books.tests.test_book_api import sample_book
+from borrowings.tests.test_borrowing_api import sample_borrowing
+from borrowings.tests.test_query_plans import IndexScanMixin, explain
+from payments.balances import has_pending_payments
+from payments.checks import check_webhook_secret
+from payments.gateway import (
+    CircuitBreaker,
+    FakeGateway,
+    GatewayError,
+    GatewayUnavailable,
+)
+from payments.models import (
+    OutstandingBalance,
+    Payment,
+    ReconciliationCheckpoint,
+    StripeEvent,
+)
+from payments.reconciliation import CHECKPOINT, reconcile_sessions
+from payments.serializers import PaymentListSerializer
+from payments.sessions import ensure_session, try_ensure_session
+
+PAYMENT_URL = reverse("payments:payment-list")
+WEBHOOK_URL = reverse("payments:payment-webhook")
+WEBHOOK_SECRET = "whsec_test"
+
+
+def detail_url(payment_id: int):
+    return reverse("payments:payment-detail", args=[payment_id])
+
+
+def sample_payment(**params):
+    defaults = {
+        "status": "PENDING",
+        "type": "PAYMENT",
+        "session_url": "https://checkout.stripe.com/pay/test",
+        "session_id": "cs_test",
+        "money_to_pay": 10,
+    }
+    defaults.update(params)
+
+    return Payment.objects.create(**defaults)
+
+
+def stripe_event(event_type: str, session: dict, event_id: str = "evt_1"):
+    """Body and signature header of a webhook call, signed like Stripe does"""
+    payload = json.dumps(
+        {
+            "id": event_id,
+            "object": "event",
+            "type": event_type,
+            "data": {"object": {"object": "checkout.session", **session}},
+        }
+    )
+    timestamp = int(time.time())
+    signature = hmac.new(
+        WEBHOOK_SECRET.encode(),
+        f"{timestamp}.{payload}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return payload, f"t={timestamp},v1={signature}"
+
+
+class AuthenticatedPaymentApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book()
+
+    def test_list_matches_model_serializer_byte_for_byte(self):
+        for index in range(3):
+            sample_payment(
+                borrowing=sample_borrowing(book=self.book, user=self.user),
+                session_id=f"cs_{index}",
+                money_to_pay="7.5",
+            )
+
+        res = self.client.get(PAYMENT_URL)
+
+        expected = PaymentListSerializer(
+            Payment.objects.order_by("id"), many=True
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(res.data["results"]),
+            JSONRenderer().render(expected),
+        )
+
+    def detail_payment(self):
+        book = sample_book(title="Sharded book", inventory=6)
+        enable_sharding(book, shard_count=3)
+        return sample_payment(
+            borrowing=sample_borrowing(book=book, user=self.user),
+            session_expires_at=timezone.now() + datetime.timedelta(hours=1),
+        )
+
+    def test_detail_covers_serializer_graph_in_one_query(self):
+        payment = self.detail_payment()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(payment.id))
+
+        self.assertEqual(res.data["borrowing"]["book"]["available"], 6)
+        self.assertEqual(res.data["borrowing"]["user"]["email"], self.user.email)
+        self.assertEqual(res.data["borrowing"]["payment_id"], "cs_test")
+
+    def test_refreshed_session_keeps_joined_book_stock(self):
+        payment = self.detail_payment()
+        Payment.objects.filter(pk=payment.pk).update(
+            session_expires_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(detail_url(payment.id))
+
+        self.assertNotEqual(res.data["borrowing"]["payment_id"], "cs_test")
+        self.assertEqual(res.data["borrowing"]["book"]["available"], 6)
+        shard_queries = [
+            query for query in queries if "books_bookinventoryshard" in query["sql"]
+        ]
+        # Only the detail query itself, which joins the stock in
+        self.assertEqual(len(shard_queries), 1)
+
+    def test_sparse_detail_selects_only_the_payment(self):
+        payment = self.detail_payment()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(detail_url(payment.id), {"fields": "id,status"})
+
+        self.assertEqual(list(res.data), ["id", "status"])
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        # The borrowing is joined only to filter by the owner
+        self.assertNotIn('"borrowings_borrowing"."book_id"', sql)
+        self.assertNotIn('"books_book"', sql)
+
+    def test_compact_detail_does_not_repeat_payment(self):
+        payment = self.detail_payment()
+
+        res = self.client.get(detail_url(payment.id), {"compact": "true"})
+
+        self.assertEqual(res.data["session_id"], "cs_test")
+        self.assertEqual(res.data["borrowing"]["book"]["available"], 6)
+        for field in ("payment_status", "payment_url", "payment_id", "money_to_pay"):
+            self.assertNotIn(field, res.data["borrowing"])
+
+    def test_export_only_own_payments(self):
+        user2 = get_user_model().objects.create_user(
+            "test2@test2.com",
+            "testpass234",
+        )
+        payment = sample_payment(
+            borrowing=sample_borrowing(book=self.book, user=self.user),
+            session_id="cs_own",
+        )
+        sample_payment(
+            borrowing=sample_borrowing(book=self.book, user=user2),
+            session_id="cs_other",
+        )
+
+        res = self.client.get(reverse("payments:payment-export"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], payment.id)
+        self.assertEqual(rows[0]["money_to_pay"], "10.00")
+        self.assertEqual(rows[0]["user"], self.user.email)
+
+    def test_export_unknown_format(self):
+        res = self.client.get(reverse("payments:payment-export"), {"type": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OutstandingBalanceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass123",
+        )
+        self.borrowing = sample_borrowing(book=sample_book(), user=self.user)
+
+    def balance(self):
+        return OutstandingBalance.objects.get(user=self.user)
+
+    def test_pending_payment_counts_towards_balance(self):
+        sample_payment(borrowing=self.borrowing, money_to_pay="12.50")
+
+        self.assertEqual(self.balance().pending_count, 1)
+        self.assertEqual(self.balance().pending_amount, Decimal("12.50"))
+        self.assertTrue(has_pending_payments(self.user))
+
+    def test_paid_payment_clears_balance(self):
+        payment = sample_payment(borrowing=self.borrowing)
+
+        payment = Payment.objects.get(id=payment.id)
+        payment.status = "PAID"
+        payment.save()
+
+        self.assertEqual(self.balance().pending_count, 0)
+        self.assertEqual(self.balance().pending_amount, 0)
+        self.assertFalse(has_pending_payments(self.user))
+
+    def test_replaced_payment_moves_balance(self):
+        Payment.objects.get(
+            id=sample_payment(borrowing=self.borrowing, money_to_pay=10).id
+        ).delete()
+        sample_payment(
+            borrowing=self.borrowing,
+            type="FINE",
+            money_to_pay=4,
+            session_id="cs_2",
+        )
+
+        self.assertEqual(self.balance().pending_count, 1)
+        self.assertEqual(self.balance().pending_amount, 4)
+
+    def test_deferred_and_stale_instances_keep_balance(self):
+        payment = sample_payment(borrowing=self.borrowing)
+        stale = Payment.objects.get(id=payment.id)
+
+        deferred = Payment.objects.defer("status", "money_to_pay").get(
+            id=payment.id
+        )
+        deferred.status = "PAID"
+        deferred.save(update_fields=["status"])
+        stale.status = "PAID"
+        stale.save()
+
+        self.assertEqual(self.balance().pending_count, 0)
+        self.assertEqual(self.balance().pending_amount, 0)
+
+    def test_cascade_settles_balance_in_one_update(self):
+        book = sample_book(title="Cascade")
+        for index in range(3):
+            sample_payment(
+                borrowing=sample_borrowing(book=book, user=self.user),
+                money_to_pay=5,
+                session_id=f"cs_{index}",
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            book.delete()
+
+        balance_updates = [
+            query
+            for query in queries
+            if query["sql"].startswith('UPDATE "payments_outstandingbalance"')
+        ]
+        self.assertEqual(len(balance_updates), 1)
+        self.assertEqual(self.balance().pending_count, 0)
+        self.assertEqual(self.balance().pending_amount, 0)
+
+    def test_recompute_repairs_drift(self):
+        sample_payment(borrowing=self.borrowing, money_to_pay=7)
+        OutstandingBalance.objects.update(pending_count=5, pending_amount=1)
+
+        call_command("recompute_balances", stdout=StringIO())
+
+        self.assertEqual(self.balance().pending_count, 1)
+        self.assertEqual(self.balance().pending_amount, 7)
+
+    def test_checkout_blocked_by_outstanding_balance(self):
+        sample_payment(borrowing=self.borrowing)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        # Book lookup for validation and one balance lookup
+        with self.assertNumQueries(2):
+            res = client.post(
+                reverse("borrowings:borrowing-list"),
+                {"book": self.borrowing.book_id},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PaymentQueryPlanTests(IndexScanMixin, TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("plan@test.com", "testpass")
+        sample_payment(borrowing=sample_borrowing(book=sample_book(), user=user))
+
+    def test_success_lookup_by_session_id(self):
+        queryset = Payment.objects.filter(session_id="cs_test")
+        self.assertIndexScan(queryset)
+        self.assertIn("session_id", explain(queryset))
+
+    def test_payments_by_status(self):
+        self.assertIndexScan(
+            Payment.objects.filter(status="PENDING"), "payment_status_idx"
+        )
+
+    def test_session_id_is_unique(self):
+        user = get_user_model().objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            sample_payment(
+                borrowing=sample_borrowing(book=sample_book(), user=user)
+            )
+
+
+@mock.patch("payments.webhooks.WEBHOOK_SECRET", WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass123",
+        )
+        self.payment = sample_payment(
+            borrowing=sample_borrowing(book=sample_book(), user=self.user),
+            money_to_pay="12.50",
+        )
+
+    def post_event(self, event_type, session, event_id="evt_1", signature=None):
+        payload, header = stripe_event(event_type, session, event_id)
+        return self.client.post(
+            WEBHOOK_URL,
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=signature or header,
+        )
+
+    def test_rejects_unsigned_events(self):
+        res = self.post_event(
+            "checkout.session.completed",
+            {"id": "cs_test", "payment_status": "paid"},
+            signature="t=1,v1=forged",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+
+    def test_refuses_events_without_configured_secret(self):
+        secret = mock.patch("payments.webhooks.WEBHOOK_SECRET", None)
+        with secret, self.assertLogs("payments.views", "ERROR"):
+            res = self.post_event(
+                "checkout.session.completed",
+                {"id": "cs_test", "payment_status": "paid"},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+
+    def test_deploy_check_flags_missing_secret(self):
+        with mock.patch("payments.webhooks.WEBHOOK_SECRET", None):
+            self.assertEqual(
+                [message.id for message in check_webhook_secret(None)],
+                ["payments.W001"],
+            )
+        self.assertEqual(check_webhook_secret(None), [])
+
+    def test_completed_session_pays_once(self):
+        for _ in range(2):
+            res = self.post_event(
+                "checkout.session.completed",
+                {"id": "cs_test", "payment_status": "paid"},
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post_event(
+            "checkout.session.completed",
+            {"id": "cs_test", "payment_status": "paid"},
+            event_id="evt_2",
+        )
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PAID")
+        self.assertEqual(StripeEvent.objects.count(), 2)
+        balance = OutstandingBalance.objects.get(user=self.user)
+        self.assertEqual(balance.pending_count, 0)
+        self.assertEqual(balance.pending_amount, 0)
+
+    def test_unpaid_completed_session_stays_pending(self):
+        self.post_event(
+            "checkout.session.completed",
+            {"id": "cs_test", "payment_status": "unpaid"},
+        )
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PENDING")
+
+    def test_expired_session_is_dropped(self):
+        self.post_event("checkout.session.expired", {"id": "cs_test"})
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.session_url, "")
+        self.assertEqual(self.payment.status, "PENDING")
+
+    @mock.patch("stripe.checkout.Session.retrieve")
+    def test_success_answers_without_stripe(self, retrieve):
+        self.client.force_authenticate(self.user)
+        self.post_event(
+            "checkout.session.completed",
+            {"id": "cs_test", "payment_status": "paid"},
+        )
+
+        res = self.client.get(
+            reverse("payments:payment-success"), {"session_id": "cs_test"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["status"], "PAID")
+        retrieve.assert_not_called()
+
+
+class PaymentGatewayTests(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.gateway = FakeGateway(
+            breaker=CircuitBreaker(
+                failure_threshold=2, reset_timeout=30, clock=lambda: self.now
+            )
+        )
+
+    def test_retries_transient_failures(self):
+        self.gateway.fail(times=2)
+
+        session = self.gateway.create_session("Book", 10)
+
+        self.assertEqual(session.status, "open")
+        self.assertFalse(self.gateway.breaker.is_open)
+
+    def test_gives_up_after_max_retries(self):
+        self.gateway.fail(times=3)
+
+        with self.assertRaises(GatewayError):
+            self.gateway.create_session("Book", 10)
+        self.assertEqual(self.gateway.breaker.failures, 1)
+
+    def test_open_breaker_fails_fast_until_trial_succeeds(self):
+        for _ in range(2):
+            self.gateway.fail(times=3)
+            with self.assertRaises(GatewayError):
+                self.gateway.create_session("Book", 10)
+        self.assertTrue(self.gateway.breaker.is_open)
+
+        with self.assertRaises(GatewayUnavailable):
+            self.gateway.create_session("Book", 10)
+
+        self.now = 31
+        self.gateway.create_session("Book", 10)
+        self.assertFalse(self.gateway.breaker.is_open)
+
+    def open_breaker(self):
+        for _ in range(2):
+            self.gateway.fail(times=3)
+            with self.assertRaises(GatewayError):
+                self.gateway.create_session("Book", 10)
+        self.now = 31
+
+    def test_trial_ending_in_unexpected_error_frees_trial(self):
+        self.open_breaker()
+
+        def broken():
+            raise ValueError("bug")
+
+        with self.assertRaises(ValueError):
+            self.gateway.call(broken)
+
+        self.gateway.create_session("Book", 10)
+        self.assertFalse(self.gateway.breaker.is_open)
+
+    def test_trial_rejected_by_bulkhead_frees_trial(self):
+        gateway = FakeGateway(bulkhead_wait=0, breaker=self.gateway.breaker)
+        self.open_breaker()
+        for _ in range(gateway.max_in_flight):
+            gateway._in_flight.acquire()
+
+        with self.assertRaises(GatewayUnavailable):
+            gateway.create_session("Book", 10)
+
+        gateway._in_flight.release()
+        gateway.create_session("Book", 10)
+        self.assertFalse(gateway.breaker.is_open)
+
+    def test_bulkhead_rejects_calls_over_limit(self):
+        gateway = FakeGateway(max_in_flight=1, bulkhead_wait=0)
+
+        with self.assertRaises(GatewayUnavailable):
+            gateway.call(gateway.create_session, "Book", 10)
+
+    def test_idempotency_key_returns_same_session(self):
+        first = self.gateway.create_session("Book", 10, idempotency_key="key")
+        second = self.gateway.create_session("Book", 10, idempotency_key="key")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.gateway.sessions), 1)
+
+
+class PaymentSessionTests(TestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        patcher = mock.patch(
+            "payments.sessions.get_gateway", return_value=self.gateway
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass123",
+        )
+        self.payment = sample_payment(
+            borrowing=sample_borrowing(book=sample_book(), user=user),
+            session_url="",
+            session_id=None,
+        )
+
+    def test_ensure_session_opens_session(self):
+        ensure_session(self.payment)
+
+        self.payment.refresh_from_db()
+        self.assertIn(self.payment.session_id, self.gateway.sessions)
+        self.assertTrue(self.payment.session_url)
+
+    def test_concurrent_callers_share_one_session(self):
+        other = Payment.objects.get(pk=self.payment.pk)
+        create_session = self.gateway.create_session
+        calls = []
+
+        def racing_create_session(title, price, idempotency_key):
+            calls.append(idempotency_key)
+            if len(calls) == 1:
+                # A second request refreshes the same payment meanwhile
+                ensure_session(other)
+            return create_session(title, price, idempotency_key)
+
+        with mock.patch.object(
+            self.gateway, "create_session", side_effect=racing_create_session
+        ):
+            ensure_session(self.payment)
+
+        self.assertEqual(calls[0], calls[1])
+        self.assertEqual(len(self.gateway.sessions), 1)
+        self.assertEqual(self.payment.session_id, other.session_id)
+
+    def test_session_stored_meanwhile_is_kept(self):
+        create_session = self.gateway.create_session
+
+        def slow_create_session(*args, **kwargs):
+            # Another request stores its session during the provider call
+            Payment.objects.filter(pk=self.payment.pk).update(
+                session_url="https://checkout.stripe.test/other",
+                session_id="cs_other",
+            )
+            return create_session(*args, **kwargs)
+
+        with mock.patch.object(
+            self.gateway, "create_session", side_effect=slow_create_session
+        ):
+            ensure_session(self.payment)
+
+        self.assertEqual(self.payment.session_id, "cs_other")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.session_id, "cs_other")
+
+    def expire_soon(self):
+        Payment.objects.filter(pk=self.payment.pk).update(
+            session_expires_at=timezone.now() + datetime.timedelta(minutes=2)
+        )
+        self.payment.refresh_from_db()
+
+    def test_replaced_session_is_closed(self):
+        ensure_session(self.payment)
+        old_id = self.payment.session_id
+        self.expire_soon()
+
+        ensure_session(self.payment)
+
+        self.assertNotEqual(self.payment.session_id, old_id)
+        self.assertEqual(self.gateway.sessions[old_id].status, "expired")
+
+    def test_paying_on_replaced_session_settles_payment(self):
+        ensure_session(self.payment)
+        old_id = self.payment.session_id
+        self.expire_soon()
+        # The user pays on the old page just before it is replaced
+        self.gateway.complete(old_id)
+
+        ensure_session(self.payment)
+
+        self.assertEqual(self.payment.session_id, old_id)
+        self.assertEqual(len(self.gateway.sessions), 1)
+        with mock.patch(
+            "payments.reconciliation.get_gateway", return_value=self.gateway
+        ):
+            self.assertEqual(reconcile_sessions()["paid"], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "PAID")
+
+    def test_try_ensure_session_degrades_when_provider_is_down(self):
+        self.gateway.fail(times=3)
+
+        with self.assertLogs("payments.sessions", "WARNING"):
+            payment = try_ensure_session(self.payment)
+
+        self.assertEqual(payment.session_url, "")
+        self.assertFalse(self.gateway.sessions)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        patcher = mock.patch(
+            "payments.reconciliation.get_gateway", return_value=self.gateway
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass123",
+        )
+        self.book = sample_book()
+
+    def open_payment(self, created: int) -> Payment:
+        session = self.gateway.create_session("Book", 10)
+        self.gateway.sessions[session.id] = session._replace(created=created)
+        return sample_payment(
+            borrowing=sample_borrowing(book=self.book, user=self.user),
+            session_id=session.id,
+        )
+
+    def checkpoint(self) -> int:
+        return ReconciliationCheckpoint.objects.get(name=CHECKPOINT).created_since
+
+    def test_settles_paid_and_drops_expired_sessions(self):
+        paid = [self.open_payment(created=100 + index) for index in range(3)]
+        expired = self.open_payment(created=200)
+        still_open = self.open_payment(created=150)
+        for payment in paid:
+            self.gateway.complete(payment.session_id)
+        self.gateway.expire(expired.session_id)
+
+        result = reconcile_sessions(page_size=2)
+
+        self.assertEqual(result, {"sessions": 5, "paid": 3, "expired": 1})
+        self.assertEqual(
+            Payment.objects.filter(status="PAID").count(), len(paid)
+        )
+        expired.refresh_from_db()
+        self.assertEqual(expired.session_url, "")
+        balance = OutstandingBalance.objects.get(user=self.user)
+        self.assertEqual(balance.pending_count, 2)
+        # Resumes from the session that may still be paid
+        self.assertEqual(self.checkpoint(), 150)
+
+        self.gateway.complete(still_open.session_id)
+        result = reconcile_sessions()
+
+        self.assertEqual(result, {"sessions": 2, "paid": 1, "expired": 0})
+        self.assertEqual(self.checkpoint(), 200)
+
+    def test_skips_sessions_before_checkpoint(self):
+        old = self.open_payment(created=100)
+        self.gateway.complete(old.session_id)
+        ReconciliationCheckpoint.objects.create(
+            name=CHECKPOINT, created_since=101
+        )
+
+        result = reconcile_sessions()
+
+        self.assertEqual(result["sessions"], 0)
+        old.refresh_from_db()
+        self.assertEqual(old.status, "PENDING")
+
+    def test_queries_do_not_grow_with_page(self):
+        for index in range(20):
+            payment = self.open_payment(created=100 + index)
+            self.gateway.complete(payment.session_id)
+
+        # Checkpoint, a locked SELECT and an UPDATE per page, balance, save
+        with self.assertNumQueries(10):
+            reconcile_sessions(page_size=100)
+
+    def test_command_accepts_start_time(self):
+        payment = self.open_payment(created=100)
+        self.gateway.complete(payment.session_id)
+        ReconciliationCheckpoint.objects.create(
+            name=CHECKPOINT, created_since=500
+        )
+
+        call_command("reconcile_payments", since=0, stdout=StringIO())
 
-# Create your tests here.
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "PAID")
@@ -1,60 +1,164 @@
+import logging
+
 import stripe
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from books.inventory import attach_book_inventory, with_book_inventory
+from library_service.exports import stream_export
+from library_service.pagination import IdCursorPagination
+from library_service.sparse_fields import sparse_related
+from library_service.values_serializers import ValuesListMixin
+from payments import webhooks
 from payments.models import Payment
+from payments.sessions import try_ensure_session
 from payments.serializers import (
     PaymentListSerializer,
     PaymentDetailSerializer,
-    PaymentSuccessSerializer
+    PaymentCompactDetailSerializer,
+    PaymentSuccessSerializer,
+    payment_list_values,
 )
 
+logger = logging.getLogger(__name__)
+
+COMPACT_PARAM = "compact"
+
 
 class PaymentViewSet(
+    ValuesListMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     queryset = Payment.objects.select_related("borrowing")
     permission_classes = (IsAuthenticated,)
+    pagination_class = IdCursorPagination
+    values_serializer = payment_list_values
+    sparse_relations = {
+        "list": {
+            "user": ("borrowing__user",),
+        },
+        "retrieve": {
+            "borrowing": (
+                "borrowing__user",
+                "borrowing__book",
+                "borrowing__book__loan_summary",
+            ),
+        },
+    }
 
     def get_queryset(self):
+        queryset = self.queryset
+        relations = self.sparse_relations.get(self.action)
+        if relations is not None:
+            related = sparse_related(self.request, relations)
+            queryset = Payment.objects.all()
+            if related:
+                # A bare select_related() would join every non-null FK
+                queryset = queryset.select_related(*related)
+            if self.action == "retrieve" and "borrowing__book" in related:
+                queryset = with_book_inventory(queryset, "borrowing__book")
+
         if not self.request.user.is_staff:
-            return self.queryset.filter(
+            return queryset.filter(
                 borrowing__user=self.request.user
             )
-        return self.queryset
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
             return PaymentListSerializer
         if self.action == "retrieve":
+            if self.request.query_params.get(COMPACT_PARAM) == "true":
+                return PaymentCompactDetailSerializer
             return PaymentDetailSerializer
         if self.action == "success":
             return PaymentSuccessSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                COMPACT_PARAM,
+                type=OpenApiTypes.BOOL,
+                description="Leave the payment fields out of the nested "
+                            "borrowing, they repeat the payment itself",
+            )
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        payment = self.get_object()
+        attach_book_inventory(payment, "borrowing__book")
+        payment = try_ensure_session(payment)
+        serializer = self.get_serializer(payment)
+        return Response(serializer.data)
+
     @action(methods=["GET"], url_path="success", detail=False)
     def success(self, request, session_id=None):
+        """
+        Landing page after Checkout. Answers from the database, which the
+        Stripe webhook keeps up to date: `PENDING` means not confirmed yet.
+        """
         session_id = request.query_params.get("session_id")
-        session = stripe.checkout.Session.retrieve(session_id)
-        if session["status"] == "complete":
-            payment = Payment.objects.get(session_id=session_id)
-            data = {
-                "status": "PAID",
-                "type": "PAYMENT"
-            }
-            serializer = self.get_serializer(payment, data=data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
-
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        payment = get_object_or_404(self.get_queryset(), session_id=session_id)
+        serializer = self.get_serializer(payment)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(request=None, responses=None)
+    @action(
+        methods=["POST"],
+        url_path="webhook",
+        detail=False,
+        authentication_classes=(),
+        permission_classes=(AllowAny,),
+    )
+    def webhook(self, request):
+        """Receives Checkout session events signed by Stripe"""
+        if not webhooks.WEBHOOK_SECRET:
+            # Unverifiable events are refused; Stripe retries them later
+            logger.error("STRIPE_WEBHOOK_SECRET is not set, webhook refused")
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body,
+                request.headers.get("Stripe-Signature", ""),
+                webhooks.WEBHOOK_SECRET,
+            )
+        except (ValueError, stripe.error.SignatureVerificationError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        webhooks.handle_event(event)
+        return Response(status=status.HTTP_200_OK)
 
     @action(methods=["GET"], url_path="cancel", detail=False)
     def cancel(self, request):
         raise ValidationError(
             "Payment can be paid a bit later (but the session is available for only 24h)"
         )
+
+    @extend_schema(responses=OpenApiTypes.BINARY)
+    @action(methods=["GET"], url_path="export", detail=False)
+    def export(self, request):
+        """Stream payments as NDJSON (default) or CSV with `?type=csv`"""
+        return stream_export(
+            self.get_queryset(),
+            {
+                "id": "id",
+                "status": "status",
+                "type": "type",
+                "borrowing": "borrowing_id",
+                "session_url": "session_url",
+                "session_id": "session_id",
+                "money_to_pay": "money_to_pay",
+                "user": "borrowing__user__email",
+            },
+            request.query_params.get("type", "ndjson"),
+            "payments",
+        )
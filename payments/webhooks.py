@@ -0,0 +1,80 @@
+import os
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from payments.balances import adjust_balance
+from payments.models import Payment, StripeEvent
+
+WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+
+SESSION_COMPLETED = "checkout.session.completed"
+SESSION_EXPIRED = "checkout.session.expired"
+# Completed sessions of delayed payment methods are paid later
+SESSION_ASYNC_SUCCEEDED = "checkout.session.async_payment_succeeded"
+
+
+def mark_paid_many(session_ids) -> int:
+    """
+    Settle the pending payments of Checkout sessions with one UPDATE. The
+    status condition makes repeated calls harmless. Returns how many changed.
+    """
+    with transaction.atomic():
+        pending = list(
+            Payment.objects.select_for_update()
+            .filter(session_id__in=list(session_ids), status="PENDING")
+            .values_list("pk", "money_to_pay", "borrowing__user_id")
+        )
+        if not pending:
+            return 0
+        paid = Payment.objects.filter(
+            pk__in=[pk for pk, _, _ in pending], status="PENDING"
+        ).update(status="PAID")
+
+        # The UPDATE skipped the payment signals, keep the balances in step
+        balances = defaultdict(lambda: [0, 0])
+        for _, money_to_pay, user_id in pending:
+            balances[user_id][0] -= 1
+            balances[user_id][1] -= money_to_pay
+        for user_id, (count, amount) in balances.items():
+            adjust_balance(user_id, count, amount)
+    return paid
+
+
+def mark_paid(session_id: str) -> bool:
+    return bool(mark_paid_many([session_id]))
+
+
+def forget_sessions(session_ids) -> int:
+    """Drop expired sessions, the next read of a payment opens a new one"""
+    return (
+        Payment.objects.filter(session_id__in=list(session_ids), status="PENDING")
+        .exclude(session_url="")
+        .update(session_url="", session_expires_at=None)
+    )
+
+
+def forget_session(session_id: str) -> bool:
+    return bool(forget_sessions([session_id]))
+
+
+def handle_event(event) -> bool:
+    """
+    Apply a verified Stripe event once. Returns False for events that were
+    seen before or are of no interest.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                StripeEvent.objects.create(id=event["id"], type=event["type"])
+        except IntegrityError:
+            return False
+
+        session = event["data"]["object"]
+        if event["type"] in (SESSION_COMPLETED, SESSION_ASYNC_SUCCEEDED):
+            if session.get("payment_status") != "paid":
+                return False
+            return mark_paid(session["id"])
+        if event["type"] == SESSION_EXPIRED:
+            return forget_session(session["id"])
+    return False